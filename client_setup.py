@@ -1,8 +1,9 @@
 # client_setup.py
 import argparse
+import importlib.util
 import os
 import logging
-from openai import OpenAI, APIError
+from openai import OpenAI, AsyncOpenAI, APIError, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 import httpx
 
@@ -40,15 +41,22 @@ MINIMAP_2D = True # Set to False to disable 2D minimap features
 REASONING_ENABLED = True # Set to False to disable reasoning features
 MAX_TOKENS = 2048 # Default maximum tokens for model responses
 SYSTEM_PROMPT_UNSUPPORTED = False # Instead it will be injected into messages. (NOT IMPLEMENTED YET)
+SINGLE_SYSTEM_MESSAGE = False # Set to True if the chat template rejects a second system message; the history summary is merged into the system prompt instead (always on for LMSTUDIO/OLLAMA)
 TEMPERATURE = 0.7 # Default temperature for model responses
 IMAGE_DETAIL = "low" # Default image detail level can be "low", or "high"
 USES_MAX_COMPLETION_TOKENS = True # Some models (OAI o3) require setting max_completion_tokens instead of max_tokens
 USES_DEFAULT_TEMPERATURE = True # Some models (OAI o3) don't support temperature, so we use a default value (1)
 
 TIMEOUT = httpx.Timeout(15.0, read=15.0, write=10.0, connect=10.0) 
+# cycles are several seconds apart; keep idle connections around well past that
+KEEPALIVE_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=4, keepalive_expiry=120.0)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None # httpx only speaks HTTP/2 with the h2 extra installed
 
 load_dotenv() # Load variables from .env file
 
+# Optional: sent as OpenAI's prompt_cache_key so every call sharing the system prompt prefix is routed to the same cache
+PROMPT_CACHE_KEY = os.getenv("PROMPT_CACHE_KEY")
+
 def get_config(env_var: str, default_value: str) -> str:
     """Gets configuration from environment variable or returns default."""
     value = os.getenv(env_var, default_value)
@@ -257,4 +265,33 @@ def setup_llm_client() -> tuple[OpenAI | None, str | None, str | None]:
 
     log.info(f"LLM Client setup complete. Image Detail: {IMAGE_DETAIL}")
     print(f"Client: {client}, model: {model}, supports_reasoning: {supports_reasoning}")
-    return client, model, supports_reasoning
\ No newline at end of file
+    return client, model, supports_reasoning
+
+
+def make_async_client(client: OpenAI | None) -> AsyncOpenAI | None:
+    """Async twin of a client from setup_llm_client(): same key, base URL, timeout and retries."""
+    if client is None:
+        return None
+    # one long-lived pool so the TLS session survives the gap between cycles
+    http_client = DefaultAsyncHttpxClient(
+        http2=HTTP2_AVAILABLE,
+        limits=KEEPALIVE_LIMITS,
+        timeout=client.timeout,
+    )
+    return AsyncOpenAI(
+        api_key=client.api_key,
+        base_url=client.base_url,
+        timeout=client.timeout,
+        max_retries=client.max_retries,
+        http_client=http_client,
+    )
+
+
+async def warm_async_client(aclient: AsyncOpenAI | None) -> None:
+    """Open the async client's connection before the first real call (cheap models list)."""
+    if aclient is None:
+        return
+    try:
+        await aclient.with_options(max_retries=0).models.list()
+    except Exception as e:
+        log.warning(f"Could not pre-connect async LLM client: {e}")
@@ -2,6 +2,7 @@ import sys
 from pyAIAgent.utils.file_utils import find_mgba
 
 PORT = 8888 # mGBA socket port
+UNIX_SOCKET = None # optional AF_UNIX path to the emulator (e.g. a local relay); falls back to PORT
 LOAD_SAVESTATE = False # should we load a savestate? Updated by CLI
 LUA_SCRIPT = './socketserver.lua' # Adjust if needed
 benchmark_path = None   # default: no external benchmark
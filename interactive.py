@@ -59,7 +59,7 @@ def cmd_capture(sock, filename=None):
     """Captures the game screen."""
     fn = filename or "latest.png"
     try:
-        capture(sock, fn)
+        capture(sock, fn).result()
         print(f"Captured image to {fn}")
         return fn
     except Exception as e:
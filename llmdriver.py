@@ -1,27 +1,28 @@
 import os
-import json
 import time
 import base64
-import copy
+import hashlib
 import asyncio
-import datetime
 import logging
 import socket
 import math
 import re
-import concurrent.futures
 import functools
+import inspect
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
+import orjson
 from PIL import Image
-from token_coutner import count_tokens, calculate_prompt_tokens
+from token_coutner import count_tokens, calculate_prompt_tokens, clear_message_token_cache
 
-from pyAIAgent.game.state import prep_llm
+from pyAIAgent.game.state import prep_llm, wait_for_saves
 from pyAIAgent.navigation import touch_controls_path_find
 from pyAIAgent.json_parser import parse_optional_fenced_json
-from prompts import build_system_prompt, get_summary_prompt
-from client_setup import setup_llm_client
+from prompts import build_system_prompt, build_summary_prompt, get_summary_prompt
+from client_setup import setup_llm_client, make_async_client, warm_async_client
 from benchmark import Benchmark
-from client_setup import DEFAULT_MODE, ONE_IMAGE_PER_PROMPT, REASONING_ENABLED, USES_DEFAULT_TEMPERATURE, REASONING_EFFORT, IMAGE_DETAIL, USES_MAX_COMPLETION_TOKENS, MAX_TOKENS, TEMPERATURE, MINIMAP_ENABLED, MINIMAP_2D, SYSTEM_PROMPT_UNSUPPORTED
+from client_setup import DEFAULT_MODE, ONE_IMAGE_PER_PROMPT, REASONING_ENABLED, USES_DEFAULT_TEMPERATURE, REASONING_EFFORT, IMAGE_DETAIL, USES_MAX_COMPLETION_TOKENS, MAX_TOKENS, TEMPERATURE, MINIMAP_ENABLED, MINIMAP_2D, SYSTEM_PROMPT_UNSUPPORTED, PROMPT_CACHE_KEY, SINGLE_SYSTEM_MESSAGE
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 log = logging.getLogger('llmdriver')
@@ -30,6 +31,9 @@ log = logging.getLogger('llmdriver')
 ACTION_RE = re.compile(r'^[LRUDABS](?:;[LRUDABS])*(?:;)?$')
 COORD_RE = re.compile(r'^([0-9]),([0-8])$')
 ANALYSIS_RE = re.compile(r"<game_analysis>([\s\S]*?)</game_analysis>", re.IGNORECASE)
+# trailing flat {"action": ...} / {"touch": ...} object; searched over TAIL_JSON_CHARS only
+TAIL_JSON_RE = re.compile(r'\{[^{}]*\}\s*\Z')
+TAIL_JSON_CHARS = 512
 IS_LOCAL = DEFAULT_MODE == "LMSTUDIO" or DEFAULT_MODE == "OLLAMA"
 
 if(IS_LOCAL):
@@ -39,6 +43,8 @@ else:
     STREAM_TIMEOUT = 60
 
 CLEANUP_WINDOW = 10 # Sometimes 4 is a good choice for local
+# local chat templates often reject or drop a second system message
+MERGE_SUMMARY_INTO_SYSTEM = SINGLE_SYSTEM_MESSAGE or IS_LOCAL
 
 SCREENSHOT_PATH = "latest.png"
 MINIMAP_PATH = "minimap.png"
@@ -47,15 +53,29 @@ SAVED_SCREENSHOT_PATH = SCREENSHOT_PATH
 SAVED_MINIMAP_PATH = MINIMAP_PATH
 
 client, MODEL, supports_reasoning = setup_llm_client()
+# requests go through the async client so streaming runs on the event loop
+aclient = make_async_client(client)
 chat_history = []
+base_system_prompt = ""
 response_count = 0
 action_count = 0
 tokens_used_session = 0
-start_time = datetime.datetime.now()
+start_time = time.monotonic()
 
 
 # ─── Constants ────────────────────────────────────────────────────────────────
 LLM_TOTAL_TIMEOUT = STREAM_TIMEOUT + 10     # e.g. 70 s / 130 s
+BROADCAST_QUEUE_SIZE = 32                   # pending WS updates before the loop waits
+BROADCAST_DRAIN_TIMEOUT = 5                 # s to flush pending WS updates on exit
+MIN_CYCLE_WAIT = 10                         # s the emulator gets between actions, however long the LLM took
+
+async def close_llm_clients() -> None:
+    """Close the shared LLM clients' HTTP pools; call once on shutdown."""
+    if aclient is not None:
+        await aclient.close()
+    if client is not None:
+        client.close()
+
 
 # ─── Helper ───────────────────────────────────────────────────────────────────
 async def call_llm_with_timeout(state_data: dict,
@@ -63,44 +83,48 @@ async def call_llm_with_timeout(state_data: dict,
                                 total_timeout: float = LLM_TOTAL_TIMEOUT,
                                 benchmark: Benchmark = None):
     """
-    Run `llm_stream_action` in a worker thread and abort the whole thing
-    (token‑counting, API call, streaming, parsing…) after `total_timeout` s.
+    Run `llm_stream_action` and abort the whole thing
+    (token‑counting, API call, streaming, parsing…) after `total_timeout` s,
+    then summarize the history once CLEANUP_WINDOW turns have piled up.
     """
-    loop = asyncio.get_running_loop()
-    fn   = functools.partial(llm_stream_action, state_data, llm_timeout, benchmark)
-
+    global response_count
     try:
-        # run blocking LLM code in a thread, wait with an asyncio timeout
-        return await asyncio.wait_for(loop.run_in_executor(None, fn),
-                                      timeout=total_timeout)
+        action, analysis_text = await asyncio.wait_for(llm_stream_action(state_data, llm_timeout),
+                                                       timeout=total_timeout)
     except asyncio.TimeoutError:
         log.error(f"llm_stream_action exceeded {total_timeout}s – skipping cycle.")
         return None, None, None
 
-def summarize_and_reset(benchmark: Benchmark = None):
-    """Condenses history, updates system prompt, resets history, accounts for tokens."""
+    # Cleanup history if window is reached. Done outside the timed call so a
+    # slow summary can't discard an action already parsed, and a timeout
+    # can't leave the history reset half-applied.
+    summary_json = None
+    if response_count >= CLEANUP_WINDOW:
+        summary_json = await summarize_and_reset(benchmark)
+        response_count = 0 # Reset counter
+        await asyncio.sleep(5)
+    return action, analysis_text, summary_json
+
+async def summarize_and_reset(benchmark: Benchmark = None):
+    """Condenses history, resets it to the system prompt plus the new summary, accounts for tokens."""
     global chat_history, response_count, tokens_used_session
 
     log.info(f"Summarizing chat history ({len(chat_history)} messages)...")
 
 
-    history_for_summary = []
-
     # we convert from 'assistant' to 'user' since many API's don't like multiple 'assistant'
-    # messages and will error out.
-    for msg in chat_history:
-        if msg['role'] == 'assistant':
-            history_for_summary.append({
-                'role': 'user',
-                'content': msg['content']
-            })
-
+    # messages and will error out. Contents are plain strings, so they are shared, not copied.
+    history_for_summary = [
+        {'role': 'user', 'content': msg['content']}
+        for msg in chat_history if msg['role'] == 'assistant'
+    ]
 
     if not history_for_summary:
         log.info("No relevant assistant messages to summarize, skipping summarization call.")
 
-        current_system_prompt = chat_history[0]
-        chat_history = [current_system_prompt]
+        # keep the base prompt and any earlier summary, drop the turns
+        chat_history = [msg for msg in chat_history if msg['role'] == 'system']
+        clear_message_token_cache(keep=chat_history)
         response_count = 0
         log.info("History reset to system prompt without summarization.")
         return None
@@ -132,7 +156,7 @@ def summarize_and_reset(benchmark: Benchmark = None):
         kwargs["temperature"] = TEMPERATURE
 
     try:
-        summary_resp = client.chat.completions.create(**kwargs)
+        summary_resp = await aclient.chat.completions.create(**kwargs)
         if summary_resp.choices and summary_resp.choices[0].message.content:
             summary_text = summary_resp.choices[0].message.content.strip()
             summary_output_tokens = count_tokens(summary_text)
@@ -151,28 +175,102 @@ def summarize_and_reset(benchmark: Benchmark = None):
     
     log.info(f"LLM Summary generated ({summary_output_tokens} tokens): {str(json_object)}")
 
-    benchInstructions = ""
-    if benchmark is not None:
-        benchInstructions = benchmark.instructions
-
-    new_system_prompt_content = build_system_prompt(summary_text, benchInstructions)
-    chat_history = [{"role": "system", "content": new_system_prompt_content}]
+    summary_message = build_summary_prompt(summary_text)
+    if MERGE_SUMMARY_INTO_SYSTEM:
+        # one system message only: rebuild it from the base prompt plus the new summary
+        chat_history = [{"role": "system", "content": f"{base_system_prompt}\n\n{summary_message}"}]
+    else:
+        # the base system prompt is left byte-identical so provider-side prefix
+        # caching keeps hitting; the summary goes in its own system message
+        chat_history = [chat_history[0], {"role": "system", "content": summary_message}]
+    clear_message_token_cache(keep=chat_history)
     response_count = 0
     log.info("Chat history summarized and reset.")
     return json_object
 
 
-def next_with_timeout(iterator, timeout: float):
-    """Attempt to pull the first chunk from `iterator` within `timeout` seconds."""
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(lambda: next(iterator))
-        try:
-            return future.result(timeout=timeout)
-        except concurrent.futures.TimeoutError:
-            raise TimeoutError(f"No chunk received in {timeout}s")
+_ECHO_FLUSH_INTERVAL = 0.05
+_last_echo_flush = 0.0
+
+def _echo(delta: str) -> None:
+    """Live-print a stream delta; flush on newlines or every _ECHO_FLUSH_INTERVAL, not per token."""
+    global _last_echo_flush
+    sys.stdout.write(delta)
+    now = time.monotonic()
+    if "\n" in delta or now - _last_echo_flush >= _ECHO_FLUSH_INTERVAL:
+        sys.stdout.flush()
+        _last_echo_flush = now
+
+
+# the same few chains ("A;", "U;U;"...) come back constantly; remember the verdict
+@functools.lru_cache(maxsize=256)
+def is_valid_action(text: str) -> bool:
+    return ACTION_RE.match(text) is not None
+
+
+def _has_action_json(text: str) -> bool:
+    """True once `text` ends with a complete {"action": ...} or {"touch": ...} object."""
+    match = TAIL_JSON_RE.search(text)
+    if not match:
+        return False
+    try:
+        parsed = orjson.loads(match.group(0))
+    except orjson.JSONDecodeError:
+        return False
+    return isinstance(parsed, dict) and ("action" in parsed or "touch" in parsed)
+
+
+def _analysis_tags(text: str) -> tuple[bool, bool]:
+    """Whether `text` contains the opening / closing <game_analysis> tag."""
+    low = text.lower()
+    return "<game_analysis>" in low, "</game_analysis>" in low
+
+
+def _touch_action(state_data: dict, touch: str):
+    """Path-find from the player's position to the "x,y" grid cell the model picked."""
+    x, y = state_data["position"]
+    coords = [int(i) for i in touch.split(",")]
+    return touch_controls_path_find(state_data["map_id"], [x, y], coords)
 
 
-def llm_stream_action(state_data: dict, timeout: float = STREAM_TIMEOUT, benchmark: Benchmark = None):
+def _extract_analysis(full_output: str) -> str | None:
+    """Text inside <game_analysis>...</game_analysis>, if present."""
+    match = ANALYSIS_RE.search(full_output)
+    return match.group(1).strip() if match else None
+
+
+def _extract_action(full_output: str, state_data: dict):
+    """
+    Action from a stripped LLM reply: the trailing {"action"}/{"touch"} JSON,
+    else a bare action chain or touch coords on the last line. None if neither.
+    """
+    json_match = TAIL_JSON_RE.search(full_output, max(0, len(full_output) - TAIL_JSON_CHARS))
+    if json_match:
+        try:
+            parsed = orjson.loads(json_match.group(0))
+        except orjson.JSONDecodeError:
+            log.warning("Failed to parse trailing JSON for action.")
+        else:
+            act = parsed.get("action")
+            touch = parsed.get("touch")
+            if isinstance(act, str) and is_valid_action(act):
+                return act
+            if isinstance(touch, str) and COORD_RE.match(touch):
+                return _touch_action(state_data, touch)
+
+    # Fallback: last line matching ACTION_RE or COORD_RE; the output is
+    # stripped, so its last line is the last non-blank one
+    last = full_output.rsplit("\n", 1)[-1].strip()
+    if is_valid_action(last) and not last.startswith('{'):
+        return last
+    if COORD_RE.match(last):
+        return _touch_action(state_data, last)
+    return None
+
+
+_IMAGE_KEYS = frozenset(("screenshot", "minimap"))
+
+async def llm_stream_action(state_data: dict, timeout: float = STREAM_TIMEOUT):
     """
     Determines and executes an action by querying an LLM.
     
@@ -180,13 +278,14 @@ def llm_stream_action(state_data: dict, timeout: float = STREAM_TIMEOUT, benchma
     - For models supporting a 'reasoning_effort', it uses a non-streaming call to
       avoid timeouts while the model "thinks".
     - For other models, it streams the response for lower perceived latency.
+    Returns (action, analysis text); history summarization is left to the caller.
     """
     global response_count, tokens_used_session, chat_history
 
-    summary_json = None
-    payload = copy.deepcopy(state_data)
-    screenshot = payload.pop("screenshot", None)
-    minimap = payload.pop("minimap", None)
+    # one shallow pass: the images travel as separate message parts, not in the JSON
+    screenshot = state_data.get("screenshot")
+    minimap = state_data.get("minimap")
+    payload = {k: v for k, v in state_data.items() if k not in _IMAGE_KEYS}
 
     if not MINIMAP_2D:
         print("Minimap 2D disabled, removing minimap_2d from payload.")
@@ -194,10 +293,10 @@ def llm_stream_action(state_data: dict, timeout: float = STREAM_TIMEOUT, benchma
 
     if not isinstance(payload, dict):
         log.error(f"Invalid state_data structure: {type(state_data)}")
-        return None, None, False
+        return None, None
 
     # Build the user message with text and images
-    text_segment = {"type": "text", "text": json.dumps(payload)}
+    text_segment = {"type": "text", "text": orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode()}
     current_content = [text_segment]
     image_parts_for_api = []
     
@@ -242,13 +341,16 @@ def llm_stream_action(state_data: dict, timeout: float = STREAM_TIMEOUT, benchma
         else:
             kwargs["temperature"] = TEMPERATURE
 
+        if PROMPT_CACHE_KEY:
+            kwargs["extra_body"] = {"prompt_cache_key": PROMPT_CACHE_KEY}
+
         if supports_reasoning and REASONING_ENABLED:
             # NON-STREAMING path for reasoning models: more robust against long "thinking" times.
             log.info("Model supports reasoning. Making a non-streaming API call.")
             kwargs["stream"] = False
             kwargs["reasoning_effort"] = REASONING_EFFORT
 
-            response = client.chat.completions.create(**kwargs)
+            response = await aclient.chat.completions.create(**kwargs)
             choice = response.choices[0]
             content = choice.message.content
 
@@ -267,49 +369,76 @@ def llm_stream_action(state_data: dict, timeout: float = STREAM_TIMEOUT, benchma
             log.info("Model does not use reasoning effort. Using streaming API call.")
             kwargs["stream"] = True
 
-            response = client.chat.completions.create(**kwargs)
+            response = await aclient.chat.completions.create(**kwargs)
 
-            iterator = iter(response)
+            iterator = response.__aiter__()
             collected_chunks = []
-            stream_start = time.time()
+            loop = asyncio.get_running_loop()
+            stream_deadline = loop.time() + timeout
             log.info("LLM Stream starting…")
             print(">>> ", end="", flush=True)
 
-            # First-chunk timeout
+            # closed on every way out (early stop, timeouts, errors, or the
+            # caller's total timeout cancelling us) so the shared client's
+            # connection is never left streaming
             try:
-                chunk = next_with_timeout(iterator, timeout)
-            except StopIteration:
-                log.warning("Stream ended immediately with no chunks.")
-                chunk = None
-            except TimeoutError:
-                log.warning(f"TIMEOUT waiting for first chunk after {timeout}s.")
-                return None, None, None
-
-            if chunk:
-                # Process first chunk
-                delta = chunk.choices[0].delta.content
-                if delta:
-                    print(delta, end="", flush=True)
-                    collected_chunks.append(delta)
+                # First-chunk timeout
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+                except StopAsyncIteration:
+                    log.warning("Stream ended immediately with no chunks.")
+                    chunk = None
+                except asyncio.TimeoutError:
+                    log.warning(f"TIMEOUT waiting for first chunk after {timeout}s.")
+                    return None, None
+
+                if chunk:
+                    # Process first chunk
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        _echo(delta)
+                        collected_chunks.append(delta)
                 
-                # Continue until finish or total timeout
-                if not chunk.choices[0].finish_reason:
-                    for chunk in iterator:
-                        if time.time() - stream_start > timeout:
-                            print("\n[TIMEOUT]", flush=True)
-                            log.warning(f"LLM stream timed out after {timeout}s total")
-                            raise TimeoutError(f"Stream timed out after {timeout}s")
-
-                        delta = chunk.choices[0].delta.content
-                        if delta:
-                            print(delta, end="", flush=True)
-                            collected_chunks.append(delta)
-
-                        if chunk.choices[0].finish_reason:
-                            print(f"\n[END - {chunk.choices[0].finish_reason}]", flush=True)
-                            log.info(f"LLM stream finished: {chunk.choices[0].finish_reason}")
-                            break
-            
+                    # Continue until finish or total timeout; each wait is bounded
+                    # by what is left of the budget, so a stalled stream is cut too
+                    tail = delta or ""
+                    analysis_open, analysis_done = _analysis_tags(tail)
+                    if not chunk.choices[0].finish_reason:
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(iterator.__anext__(),
+                                                               max(0, stream_deadline - loop.time()))
+                            except StopAsyncIteration:
+                                break
+                            except asyncio.TimeoutError:
+                                print("\n[TIMEOUT]", flush=True)
+                                log.warning(f"LLM stream timed out after {timeout}s total")
+                                raise TimeoutError(f"Stream timed out after {timeout}s")
+
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                _echo(delta)
+                                collected_chunks.append(delta)
+                                tail = (tail + delta)[-TAIL_JSON_CHARS:]
+                                if ">" in delta:
+                                    opened, closed = _analysis_tags(tail)
+                                    analysis_open |= opened
+                                    analysis_done |= closed
+                                # nothing after the closing action JSON can change the result,
+                                # but JSON written inside an unfinished analysis is not the answer
+                                if ("}" in delta and (analysis_done or not analysis_open)
+                                        and _has_action_json(tail)):
+                                    print("\n[END - action]", flush=True)
+                                    log.info("LLM stream stopped early: action JSON complete")
+                                    break
+
+                            if chunk.choices[0].finish_reason:
+                                print(f"\n[END - {chunk.choices[0].finish_reason}]", flush=True)
+                                log.info(f"LLM stream finished: {chunk.choices[0].finish_reason}")
+                                break
+            finally:
+                await response.close()
+
             # Assemble final output from chunks
             full_output = "".join(collected_chunks).strip()
 
@@ -317,7 +446,7 @@ def llm_stream_action(state_data: dict, timeout: float = STREAM_TIMEOUT, benchma
 
         if not full_output:
             log.error("LLM call resulted in empty output.")
-            return None, None, None
+            return None, None
 
         log.info(f"LLM raw output length: {len(full_output)} chars")
 
@@ -326,300 +455,423 @@ def llm_stream_action(state_data: dict, timeout: float = STREAM_TIMEOUT, benchma
         tokens_used_session += call_input_tokens + output_tokens
         log.info(f"Used ~{output_tokens} output tokens; session total: {tokens_used_session}")
 
-        user_hist_content = [text_segment] # Images are not saved in history
-        chat_history.append({"role": "user", "content": user_hist_content})
+        # Images are not saved in history, so the turn is stored as plain text
+        chat_history.append({"role": "user", "content": text_segment["text"]})
         chat_history.append({"role": "assistant", "content": full_output})
 
-        # Cleanup history if window is reached
         response_count += 1
-        if response_count >= CLEANUP_WINDOW:
-            summary_json = summarize_and_reset(benchmark)
-            response_count = 0 # Reset counter
-            time.sleep(5)
-
-        # Extract analysis section
-        match = ANALYSIS_RE.search(full_output)
-        if match:
-            analysis_text = match.group(1).strip()
-
-        # Extract action JSON or fallback
-        json_match = re.search(r'(\{[\s\S]*?\})\s*$', full_output)
-        if json_match:
-            try:
-                parsed = json.loads(json_match.group(1))
-                act = parsed.get("action")
-                touch = parsed.get("touch")
-                if isinstance(act, str) and ACTION_RE.match(act):
-                    action = act
-                elif isinstance(touch, str) and COORD_RE.match(touch):
-                    # handle JSON-provided touch coords
-                    x, y = state_data["position"]
-                    coords = [int(i) for i in touch.split(",")]
-                    action = touch_controls_path_find(
-                        state_data["map_id"],
-                        [x, y],
-                        coords
-                    )
-            except json.JSONDecodeError:
-                log.warning("Failed to parse trailing JSON for action.")
-
-        # Fallback: last line matching ACTION_RE or COORD_RE
-        if action is None:
-            lines = [line.strip() for line in full_output.splitlines() if line.strip()]
-            if lines:
-                last = lines[-1]
-                # plain “action” string
-                if ACTION_RE.match(last) and not last.startswith('{'):
-                    action = last
-
-                # plain touch coords
-                elif COORD_RE.match(last):
-                    x, y = state_data["position"]
-                    coords = [int(i) for i in last.split(",")]
-                    action = touch_controls_path_find(
-                        state_data["map_id"],
-                        [x, y],
-                        coords
-                    )
+
+        analysis_text = _extract_analysis(full_output)
+        action = _extract_action(full_output, state_data)
 
     except Exception as e:
         log.error(f"Error during LLM interaction: {e}", exc_info=True)
-        return None, None, None
+        return None, None
 
     if action is None:
         log.error("No valid action extracted from LLM output.")
 
-    return action, analysis_text, summary_json
+    return action, analysis_text
+
 
 
+# path -> (mtime_ns, size, blake2b digest, data URL)
+_IMAGE_URL_CACHE: dict[str, tuple[int, int, bytes, str]] = {}
+_PNG_DATA_URL_PREFIX = b"data:image/png;base64,"
 
-def encode_image_base64(image_path: str) -> str | None:
-    """Reads an image file and returns its base64 encoded string."""
-    if not os.path.exists(image_path) or os.path.getsize(image_path) == 0:
+def encode_image_data_url(image_path: str) -> str | None:
+    """Reads a PNG and returns it as a base64 data URL, or None if it's missing/empty."""
+    try:
+        st = os.stat(image_path)
+    except OSError:
         return None
+    if st.st_size == 0:
+        return None
+    cached = _IMAGE_URL_CACHE.get(image_path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[3]
     try:
         with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+            data = f.read()
     except Exception as e:
-        log.error(f"Error reading/encoding image '{image_path}': {e}")
+        log.error(f"Error reading image '{image_path}': {e}")
         return None
+    # the PNGs are rewritten every cycle even when the picture is the same
+    # (standing still, menus), so compare content before re-encoding
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    if cached and cached[2] == digest:
+        url = cached[3]
+    else:
+        # prefix joined as bytes, so the large base64 text is decoded once
+        url = (_PNG_DATA_URL_PREFIX + base64.b64encode(data)).decode("ascii")
+    _IMAGE_URL_CACHE[image_path] = (st.st_mtime_ns, st.st_size, digest, url)
+    return url
 
 
-async def run_auto_loop(sock, state: dict, broadcast_func, interval: float = 8.0, max_loops = math.inf, benchmark: Benchmark = None):
-    """Main async loop: Get state, call LLM, send action, update/broadcast state."""
-    global action_count, tokens_used_session, start_time, chat_history, SCREENSHOT_PATH, MINIMAP_PATH, SAVED_SCREENSHOT_PATH, SAVED_MINIMAP_PATH
+def image_part(image_path: str) -> dict | None:
+    """{"image_url": {...}} entry for the state payload, or None if the image is missing."""
+    url = encode_image_data_url(image_path)
+    if not url:
+        return None
+    return {"image_url": {"url": url, "detail": IMAGE_DETAIL}}
 
-    b64_mm = None
 
-    benchInstructions = ""
-    if benchmark is not None:
-        benchInstructions = benchmark.instructions
-        logging.info(f"Added bench instructions: {benchInstructions}")
-    chat_history = [{"role": "system", "content": build_system_prompt("", benchInstructions)}]
+# (screenshot stat, minimap stat) the composite on disk was built from
+_composite_sources = None
 
-    while action_count < max_loops:
-        loop_start_time = time.time()
-        current_cycle = action_count + 1
-        log.info(f"--- Loop Cycle {current_cycle} ---")
+def _stat_key(path: str) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
 
-        update_payload = {}
-        action_payload = {}
 
+def compose_screenshot_minimap(ss_path: str, mm_path: str) -> str:
+    """
+    Paste the minimap (scaled to the screenshot's height) to the right of
+    the screenshot and save it next to it. The composite is only rebuilt
+    when either source file has changed since the last call.
+    """
+    global _composite_sources
+    combined_path = os.path.splitext(ss_path)[0] + '_with_minimap.png'
+    sources = (_stat_key(ss_path), _stat_key(mm_path))
+    if sources == _composite_sources and os.path.exists(combined_path):
+        return combined_path
+
+    # Load images
+    ss_img = Image.open(ss_path)
+    mm_img = Image.open(mm_path)
+
+    # Resize minimap to match screenshot height
+    mm_ratio = ss_img.height / mm_img.height
+    new_mm_width = int(mm_img.width * mm_ratio)
+    mm_img = mm_img.resize((new_mm_width, ss_img.height), Image.LANCZOS)
+
+    # Create a new canvas wide enough for both
+    combined_width = ss_img.width + mm_img.width
+    combined = Image.new('RGB', (combined_width, ss_img.height))
+
+    # Paste screenshot at (0,0), minimap at (ss.width, 0)
+    combined.paste(ss_img, (0, 0))
+    combined.paste(mm_img, (ss_img.width, 0))
+
+    combined.save(combined_path)
+    _composite_sources = sources
+    log.info(f"Combined screenshot + minimap saved to {combined_path}")
+    return combined_path
+
+
+# action chains repeat a lot ("A;", "U;U;"...); keep their wire form around.
+# The protocol is ASCII (see send_command), so a stray non-ASCII token
+# becomes '?' rather than multibyte garbage for the Lua parser
+@functools.lru_cache(maxsize=256)
+def _action_bytes(action: str) -> bytes:
+    return (action + "\n").encode("ascii", errors="replace")
+
+
+# one non-blocking send() covers a few-byte action; anything left over
+# (full kernel buffer) is finished on a worker thread, never on the loop
+if hasattr(socket, "MSG_DONTWAIT"):
+    def _send_nowait(sock, data: bytes) -> int:
         try:
-            log.info("Requesting game state from mGBA...")
-            current_mGBA_state = prep_llm(sock)
+            return sock.send(data, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return 0
+else:
+    # Windows has no MSG_DONTWAIT; switch the socket to non-blocking for the send
+    def _send_nowait(sock, data: bytes) -> int:
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            return sock.send(data)
+        except BlockingIOError:
+            return 0
+        finally:
+            sock.settimeout(timeout)
 
-            if benchmark is not None:
-                # check if we complted the bench
-                if(benchmark.validation(current_mGBA_state)):
-                    break
+async def _send_action(sock, data: bytes) -> None:
+    sent = _send_nowait(sock, data)
+    if sent < len(data):
+        await asyncio.to_thread(sock.sendall, data[sent:])
 
-            #print(str(current_mGBA_state))
-            if not current_mGBA_state:
-                log.error("Failed to get state from mGBA (prep_llm returned None). Skipping.")
-                await asyncio.sleep(max(0, interval - (time.time() - loop_start_time)))
-                continue
-            log.info("Received game state from mGBA.")
-        except socket.timeout:
-             log.error("Socket timeout getting state from mGBA. Stopping loop.")
-             break
-        except socket.error as se:
-             log.error(f"Socket error getting state from mGBA: {se}. Stopping loop.")
-             break
-        except Exception as e:
-            log.error(f"Error getting state from mGBA: {e}", exc_info=True)
-            await asyncio.sleep(max(0, interval - (time.time() - loop_start_time)))
-            continue
 
+# second worker for prepare_prompt_images when the minimap is sent as its own image
+_IMAGE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-encode")
 
-        llm_input_state = copy.deepcopy(current_mGBA_state)
-        state_update_start = time.time()
+def prepare_prompt_images(screenshot_path: str) -> tuple[str, dict | None, dict | None]:
+    """
+    Wait for this tick's PNGs, build the screenshot+minimap composite when
+    ONE_IMAGE_PER_PROMPT is on, and encode the image parts. Blocking; run
+    it on a worker thread. Returns (screenshot path, screenshot part,
+    separate minimap part or None).
+    """
+    wait_for_saves()
 
+    if ONE_IMAGE_PER_PROMPT and MINIMAP_ENABLED:
+        try:
+            screenshot_path = compose_screenshot_minimap(SAVED_SCREENSHOT_PATH, SAVED_MINIMAP_PATH)
+        except Exception as e:
+            log.error(f"Failed to combine minimap: {e}")
 
-        new_team = current_mGBA_state.get('party')
-        if new_team is not None and json.dumps(new_team) != json.dumps(state.get('currentTeam')):
-            state['currentTeam'] = new_team
-            update_payload['currentTeam'] = state['currentTeam']
-            log.info("State Update: currentTeam")
+    minimap_future = None
+    if not ONE_IMAGE_PER_PROMPT and MINIMAP_ENABLED:
+        # separate minimap image: read and encode it alongside the screenshot
+        minimap_future = _IMAGE_POOL.submit(image_part, MINIMAP_PATH)
+    screenshot = image_part(screenshot_path)
+    minimap = minimap_future.result() if minimap_future else None
+    return screenshot_path, screenshot, minimap
 
 
-        badge_data = current_mGBA_state.get('badges')
-        current_state_badges = state.get('badges')
+def _set_if_changed(state: dict, payload: dict, key: str, value) -> bool:
+    """Store `value` under `key` in state and the broadcast payload if it differs; True if it did."""
+    if state.get(key) != value:
+        state[key] = value
+        payload[key] = value
+        return True
+    return False
 
-        # Compare the new list with the stored list
-        if badge_data != current_state_badges:
-            log.info(f"State Update: Badges changed from {current_state_badges} to {badge_data}")
-            state['badges'] = badge_data
-            update_payload['badges'] = badge_data
 
+def _cycle_remaining(loop_start_ns: int, interval: float) -> float:
+    """Seconds left of `interval` for a cycle that started at `loop_start_ns` (monotonic)."""
+    return max(0, interval - (time.monotonic_ns() - loop_start_ns) / 1e9)
 
-        pos = current_mGBA_state.get('position')
-        map_id = current_mGBA_state.get('map_id', 'N/A')
-        map_name = current_mGBA_state.get('map_name', '')
-        loc_str = "Unknown"
-        if pos:
-            loc_str = f"{map_name} (Map {map_id}) ({pos[0]}, {pos[1]})" if map_name else f"Map {map_id} ({pos[0]}, {pos[1]})"
-        if loc_str != state.get('minimapLocation'):
-            state['minimapLocation'] = loc_str
-            update_payload['minimapLocation'] = state['minimapLocation']
-            log.info(f"State Update: minimapLocation -> {loc_str}")
 
-        if ONE_IMAGE_PER_PROMPT and MINIMAP_ENABLED:
-            try:
-                # Load images
-                ss_img = Image.open(SAVED_SCREENSHOT_PATH)
-                mm_img = Image.open(SAVED_MINIMAP_PATH)
+async def _wait_or_stop(stop_event: asyncio.Event | None, timeout: float) -> bool:
+    """Sleep up to `timeout` seconds; returns True right away if stop_event gets set."""
+    if stop_event is None:
+        await asyncio.sleep(timeout)
+        return False
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
 
-                # Resize minimap to match screenshot height
-                mm_ratio = ss_img.height / mm_img.height
-                new_mm_width = int(mm_img.width * mm_ratio)
-                mm_img = mm_img.resize((new_mm_width, ss_img.height), Image.LANCZOS)
 
-                # Create a new canvas wide enough for both
-                combined_width = ss_img.width + mm_img.width
-                combined = Image.new('RGB', (combined_width, ss_img.height))
+async def run_auto_loop(sock, state: dict, broadcast_func, interval: float = 8.0, max_loops = math.inf, benchmark: Benchmark = None,
+                        stop_event: asyncio.Event | None = None):
+    """
+    Main async loop: Get state, call LLM, send action, update/broadcast state.
+    Setting `stop_event` ends the loop at the next wait instead of after it.
+    """
+    global action_count, tokens_used_session, start_time, chat_history, base_system_prompt, SCREENSHOT_PATH, MINIMAP_PATH, SAVED_SCREENSHOT_PATH, SAVED_MINIMAP_PATH
 
-                # Paste screenshot at (0,0), minimap at (ss.width, 0)
-                combined.paste(ss_img, (0, 0))
-                combined.paste(mm_img, (ss_img.width, 0))
+    benchInstructions = ""
+    if benchmark is not None:
+        benchInstructions = benchmark.instructions
+        logging.info(f"Added bench instructions: {benchInstructions}")
+    base_system_prompt = build_system_prompt(benchInstructions)
+    chat_history = [{"role": "system", "content": base_system_prompt}]
+    clear_message_token_cache()
+    await warm_async_client(aclient)
+    status_sec = None
+    # only this loop advances the counter, so keep it local and mirror it into state
+    log_id_counter = state.get("log_id_counter", 0)
+
+    # sync or async broadcaster; decided once, so the loop always just awaits
+    if inspect.iscoroutinefunction(broadcast_func):
+        broadcast = broadcast_func
+    else:
+        async def broadcast(payload):
+            broadcast_func(payload)
 
-                # Save combined image and override SCREENSHOT_PATH
-                combined_path = os.path.splitext(SAVED_SCREENSHOT_PATH)[0] + '_with_minimap.png'
-                combined.save(combined_path)
-                SCREENSHOT_PATH = combined_path
+    # updates are handed to one sender task so a slow WS client can't stall
+    # the cycle; the loop only waits if BROADCAST_QUEUE_SIZE updates back up
+    broadcast_queue = asyncio.Queue(maxsize=BROADCAST_QUEUE_SIZE)
 
-                log.info(f"Combined screenshot + minimap saved to {combined_path}")
+    async def broadcast_worker():
+        while True:
+            payload = await broadcast_queue.get()
+            try:
+                await broadcast(payload)
             except Exception as e:
-                log.error(f"Failed to combine minimap: {e}")
+                log.error(f"Error during WebSocket broadcast: {e}", exc_info=True)
+            finally:
+                broadcast_queue.task_done()
 
-        b64_ss = encode_image_base64(SCREENSHOT_PATH)
-        if b64_ss:
-            llm_input_state["screenshot"] = {"image_url": {"url": f"data:image/png;base64,{b64_ss}", "detail": IMAGE_DETAIL}}
-        else:
-            llm_input_state["screenshot"] = None
+    broadcaster = asyncio.create_task(broadcast_worker())
+    try:
+        while action_count < max_loops and not (stop_event and stop_event.is_set()):
+            loop_start_ns = time.monotonic_ns()
+            current_cycle = action_count + 1
+            log.info("--- Loop Cycle %d ---", current_cycle)
 
-        if not ONE_IMAGE_PER_PROMPT and MINIMAP_ENABLED:
-            b64_mm = encode_image_base64(MINIMAP_PATH)
-            if b64_mm:
-                llm_input_state["minimap"] = {"image_url": {"url": f"data:image/png;base64,{b64_mm}", "detail": IMAGE_DETAIL}}
-            else:
-                llm_input_state["minimap"] = None
+            update_payload = {}
+            action_payload = {}
 
-        log.info(f"Pre-LLM state update & image prep took {time.time() - state_update_start:.2f}s. SS:{bool(b64_ss)}, MM:{bool(b64_mm)}")
+            try:
+                log.info("Requesting game state from mGBA...")
+                # socket + PNG work is blocking; keep it off the event loop
+                current_mGBA_state = await asyncio.to_thread(prep_llm, sock)
+
+                if benchmark is not None:
+                    # check if we complted the bench
+                    if(benchmark.validation(current_mGBA_state)):
+                        break
+
+                #print(str(current_mGBA_state))
+                if not current_mGBA_state:
+                    log.error("Failed to get state from mGBA (prep_llm returned None). Skipping.")
+                    await _wait_or_stop(stop_event, _cycle_remaining(loop_start_ns, interval))
+                    continue
+                log.info("Received game state from mGBA.")
+            except socket.timeout:
+                 log.error("Socket timeout getting state from mGBA. Stopping loop.")
+                 break
+            except socket.error as se:
+                 log.error(f"Socket error getting state from mGBA: {se}. Stopping loop.")
+                 break
+            except Exception as e:
+                log.error(f"Error getting state from mGBA: {e}", exc_info=True)
+                await _wait_or_stop(stop_event, _cycle_remaining(loop_start_ns, interval))
+                continue
 
-        log_id_counter = state.get("log_id_counter", 0) + 1
-        state["log_id_counter"] = log_id_counter
 
-        action, game_analysis, summary_json = await call_llm_with_timeout(llm_input_state, benchmark=benchmark)
+            # only top-level image keys are added, so a shallow copy is enough
+            llm_input_state = dict(current_mGBA_state)
+            state_update_start_ns = time.monotonic_ns()
+            # PNG saves, composite and base64 run on a worker thread while the
+            # state diff below runs here
+            images_task = asyncio.create_task(asyncio.to_thread(prepare_prompt_images, SCREENSHOT_PATH))
 
-        if summary_json is not None:
-            tmp = {"log_entry": {"id": log_id_counter, "text": "🔎 Chat history cleaned up."}}
-            await broadcast_func(tmp)
 
-            required = ("primayGoal", "secondaryGoal", "tertiaryGoal", "otherNotes")
+            new_team = current_mGBA_state.get('party')
+            if new_team is not None and _set_if_changed(state, update_payload, 'currentTeam', new_team):
+                log.info("State Update: currentTeam")
 
-            if isinstance(summary_json, dict):
-                # summary_json is dict, safe to check for keys
-                missing = [k for k in required if k not in summary_json]
-                if not missing:
-                    state["goals"] = {
-                        "primary":   summary_json["primayGoal"],
-                        "secondary": summary_json["secondaryGoal"],
-                        "tertiary":  summary_json["tertiaryGoal"],
-                    }
-                    state["otherGoals"] = summary_json["otherNotes"]
-                    update_payload["goals"] = state["goals"]
-                    update_payload["otherGoals"] = state["otherGoals"]
-                else:
-                    logging.error(f"Missing required goal keys in summary_json: {missing!r}")
-            else:
-                logging.error(f"Expected summary_json to be dict, but got {type(summary_json).__name__!r}")
 
+            badge_data = current_mGBA_state.get('badges')
+            current_state_badges = state.get('badges')
 
-        action_to_send = None
-        log_action_text = "No action taken (LLM failed)."
+            # Compare the new list with the stored list
+            if _set_if_changed(state, update_payload, 'badges', badge_data):
+                log.info("State Update: Badges changed from %s to %s", current_state_badges, badge_data)
+
+
+            pos = current_mGBA_state.get('position')
+            map_id = current_mGBA_state.get('map_id', 'N/A')
+            map_name = current_mGBA_state.get('map_name', '')
+            loc_str = "Unknown"
+            if pos:
+                loc_str = f"{map_name} (Map {map_id}) ({pos[0]}, {pos[1]})" if map_name else f"Map {map_id} ({pos[0]}, {pos[1]})"
+            if _set_if_changed(state, update_payload, 'minimapLocation', loc_str):
+                log.info("State Update: minimapLocation -> %s", loc_str)
 
-        if action:
-            action_to_send = action
-            log_action_text = f"Action: {action}"
-            log.info(f"LLM proposed action: {action}")
             try:
-                sock.sendall((action_to_send + "\n").encode("utf-8"))
-                log.info(f"Action '{action_to_send}' sent to mGBA.")
-            except socket.error as se:
-                log.error(f"Socket error sending action '{action_to_send}': {se}. Stopping loop.")
-                break
+                SCREENSHOT_PATH, llm_input_state["screenshot"], minimap_part = await images_task
             except Exception as e:
-                log.error(f"Unexpected error sending action '{action_to_send}': {e}", exc_info=True)
+                # a failed PNG save or minimap render only costs this cycle
+                log.error(f"Error preparing images for the LLM: {e}", exc_info=True)
+                if update_payload:
+                    await broadcast_queue.put(update_payload)
+                await _wait_or_stop(stop_event, _cycle_remaining(loop_start_ns, interval))
+                continue
+            if not ONE_IMAGE_PER_PROMPT and MINIMAP_ENABLED:
+                llm_input_state["minimap"] = minimap_part
+
+            log.info("Pre-LLM state update & image prep took %.2fs. SS:%s, MM:%s",
+                     (time.monotonic_ns() - state_update_start_ns) / 1e9,
+                     bool(llm_input_state['screenshot']), bool(llm_input_state.get('minimap')))
+
+            log_id_counter += 1
+            state["log_id_counter"] = log_id_counter
+
+            action, game_analysis, summary_json = await call_llm_with_timeout(llm_input_state, benchmark=benchmark)
+
+            if summary_json is not None:
+                tmp = {"log_entry": {"id": log_id_counter, "text": "🔎 Chat history cleaned up."}}
+                await broadcast_queue.put(tmp)
+
+                required = ("primayGoal", "secondaryGoal", "tertiaryGoal", "otherNotes")
+
+                if isinstance(summary_json, dict):
+                    # summary_json is dict, safe to check for keys
+                    missing = [k for k in required if k not in summary_json]
+                    if not missing:
+                        goals = {
+                            "primary":   summary_json["primayGoal"],
+                            "secondary": summary_json["secondaryGoal"],
+                            "tertiary":  summary_json["tertiaryGoal"],
+                        }
+                        other_goals = summary_json["otherNotes"]
+                        state["goals"] = update_payload["goals"] = goals
+                        state["otherGoals"] = update_payload["otherGoals"] = other_goals
+                    else:
+                        logging.error(f"Missing required goal keys in summary_json: {missing!r}")
+                else:
+                    logging.error(f"Expected summary_json to be dict, but got {type(summary_json).__name__!r}")
 
-        else:
-            log.error("No valid action from LLM. Cannot send command.")
 
-        action_count = current_cycle
-        if state.get('actions') != action_count:
-             state['actions'] = action_count
-             update_payload['actions'] = action_count
+            action_to_send = None
+            log_action_text = "No action taken (LLM failed)."
 
-        if state.get('tokensUsed') != tokens_used_session:
-            state['tokensUsed'] = tokens_used_session
-            update_payload['tokensUsed'] = tokens_used_session
+            if action:
+                action_to_send = action
+                log_action_text = f"Action: {action}"
+                log.info("LLM proposed action: %s", action)
+                try:
+                    await _send_action(sock, _action_bytes(action_to_send))
+                    log.info("Action '%s' sent to mGBA.", action_to_send)
+                except socket.error as se:
+                    log.error(f"Socket error sending action '{action_to_send}': {se}. Stopping loop.")
+                    break
+                except Exception as e:
+                    log.error(f"Unexpected error sending action '{action_to_send}': {e}", exc_info=True)
 
-        elapsed = datetime.datetime.now() - start_time
-        game_status_str = f"{int(elapsed.total_seconds() // 3600)}h {int((elapsed.total_seconds() % 3600) // 60)}m {int(elapsed.total_seconds() % 60)}s"
-        if state.get('gameStatus') != game_status_str:
-            state['gameStatus'] = game_status_str
-            update_payload['gameStatus'] = game_status_str
+            else:
+                log.error("No valid action from LLM. Cannot send command.")
 
-        if state.get('modelName') != MODEL:
-            state['modelName'] = MODEL
-            update_payload['modelName'] = MODEL
+            action_count = current_cycle
+            _set_if_changed(state, update_payload, 'actions', action_count)
+            _set_if_changed(state, update_payload, 'tokensUsed', tokens_used_session)
 
+            # whole seconds since start; the string is only rebuilt when it can differ
+            elapsed_sec = int(time.monotonic() - start_time)
+            if elapsed_sec != status_sec:
+                status_sec = elapsed_sec
+                hours, rem = divmod(elapsed_sec, 3600)
+                minutes, seconds = divmod(rem, 60)
+                _set_if_changed(state, update_payload, 'gameStatus', f"{hours}h {minutes}m {seconds}s")
 
+            _set_if_changed(state, update_payload, 'modelName', MODEL)
 
-        analysis_log_part = f"{game_analysis.strip()}\n" if game_analysis and game_analysis.strip() else None
 
-        if analysis_log_part:
-            update_payload["log_entry"] = { "id": log_id_counter, "text": analysis_log_part }
-        if action:
-            action_payload["log_entry"] = { "id": log_id_counter, "text": log_action_text }
 
-        log.info(f"Log Entry #{log_id_counter}: {log_action_text} (Analysis included in state log)")
+            analysis_log_part = f"{game_analysis.strip()}\n" if game_analysis and game_analysis.strip() else None
 
-        if update_payload:
-            log.info(f"Broadcasting {len(update_payload)} state updates: {list(update_payload.keys())}")
-            try:
-                await broadcast_func(update_payload)
-                await broadcast_func(action_payload)
-            except Exception as e:
-                log.error(f"Error during WebSocket broadcast: {e}", exc_info=True)
+            if analysis_log_part:
+                update_payload["log_entry"] = { "id": log_id_counter, "text": analysis_log_part }
+            if action:
+                action_payload["log_entry"] = { "id": log_id_counter, "text": log_action_text }
 
+            log.info("Log Entry #%s: %s (Analysis included in state log)", log_id_counter, log_action_text)
 
-        elapsed_loop_time = time.time() - loop_start_time
-        wait_time = max(10, interval - elapsed_loop_time) # Ensure at least 10 seconds wait
-        log.info(f"Cycle {current_cycle} took {elapsed_loop_time:.2f}s. Waiting {wait_time:.2f}s...")
-        await asyncio.sleep(wait_time)
+            # only non-empty messages go out; a failed LLM call leaves action_payload empty
+            if update_payload:
+                if log.isEnabledFor(logging.INFO):
+                    log.info("Broadcasting %d state updates: %s", len(update_payload), list(update_payload))
+                await broadcast_queue.put(update_payload)
+            if action_payload:
+                await broadcast_queue.put(action_payload)
 
 
-    log.info("Auto loop terminated.")
+            elapsed_loop_time = (time.monotonic_ns() - loop_start_ns) / 1e9
+            wait_time = max(MIN_CYCLE_WAIT, interval - elapsed_loop_time)
+            log.info("Cycle %d took %.2fs. Waiting %.2fs...", current_cycle, elapsed_loop_time, wait_time)
+            if await _wait_or_stop(stop_event, wait_time):
+                break
+
+
+        log.info("Auto loop terminated.")
+        # let queued updates reach the UI before the sender goes away
+        try:
+            await asyncio.wait_for(broadcast_queue.join(), BROADCAST_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning("Dropping undelivered WebSocket updates on shutdown.")
+    finally:
+        # also runs when the loop task is cancelled or raises
+        broadcaster.cancel()
+        try:
+            await broadcaster
+        except asyncio.CancelledError:
+            pass
     if benchmark is not None:
         benchmark.finalize(current_mGBA_state, MODEL)
\ No newline at end of file
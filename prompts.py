@@ -1,13 +1,14 @@
-def build_system_prompt(actionSummary: str = "", benchmarkInstruction: str = "") -> str:
-    """Constructs the system prompt for the LLM, including the chat history summary."""
-    return f"""
+# The system prompt only varies in the benchmark text, so the fixed parts
+# are plain module constants joined around it. The summary is sent as its
+# own system message (build_summary_prompt).
+_PROMPT_HEAD = """
         You are an AI agent designed to play Pokémon Red. Your task is to analyze the game state, plan your actions, and provide input commands to progress through the game.
 
-        Your previous actions summary: {actionSummary}
-
         General Instructions:
 
-        {benchmarkInstruction}
+        """
+
+_PROMPT_TAIL = """
         
         - Speak in the first person as if you were the player. You don't see a screenshots or the screen, you see your surroundings.
         - Do not call it a screenshot or the screen. It's your world.
@@ -82,7 +83,7 @@ def build_system_prompt(actionSummary: str = "", benchmarkInstruction: str = "")
         [Your detailed analysis and planning goes here]
         </game_analysis>
 
-        {{"action":"U;R;R;D;"}}
+        {"action":"U;R;R;D;"}
         "
 
         Alternatively, instead of an action, you can specificy location you would like to navigate to by providing a touch command on the onscreen grid.
@@ -94,7 +95,7 @@ def build_system_prompt(actionSummary: str = "", benchmarkInstruction: str = "")
         YOU MAY ONLY TOUCH THE SCREENSHOT GRID, NOT THE MINIMAP. X MAX = 9, Y MAX = 8. X MIN = 0, Y MIN = 0. Any out of bounds coordinates will be invalid.
 
         Example:
-        {{"touch":"5,5"}}
+        {"touch":"5,5"}
 
         This would move the player RIGHT, and DOWN (y=y+1, x=x+1). The pathfinder will navigate around objects if they are in the way.
         The pathfinder cannot navigate around NPC's. Use your vision to get yourself unstuck if your position stays the same.
@@ -111,7 +112,7 @@ def build_system_prompt(actionSummary: str = "", benchmarkInstruction: str = "")
         [Your detailed analysis and planning goes here]
         </game_analysis>
 
-        {{"touch":"5,5"}}
+        {"touch":"5,5"}
         "
 
         Remember:
@@ -119,7 +120,7 @@ def build_system_prompt(actionSummary: str = "", benchmarkInstruction: str = "")
         - Trainers and NPCs MUST at EITHER [0,-1], [0,1], [1,0], or [-1,0] TO INTERACT OR TRIGGER THEM. THE GAME WILL NEVER TRIGGER transitions or fights on its own.
         - YOU MUST BE orthogonally adjacent to trainers, NPCs, or Signs TO INTERACT. Diagonally adjacent WILL NOT TRIGGER A TRANSITION OR ACTION.
         - If attempting the same action multiple times does not start an action as you expect. MOVE to a new position and try again.
-        - Do NOT wrap your json in ```json ```, just print the raw object eg {{"action":"...;"}}
+        - Do NOT wrap your json in ```json ```, just print the raw object eg {"action":"...;"}
         - THE GAME WILL NEVER TRIGGER EVENTS (ROOM TRANSITIONS, TRAINER BATTLES) ON ITS OWN. YOU MUST MOVE INTO THEM.
         - If you have tried the same movement action multiple times in a row attempt (location stayed the same) verify your path or try a touch command.
         - USE YOUR PREVIOUS ACTIONS TO HELP AVOID GETTING STUCK IN A LOOP.
@@ -130,6 +131,14 @@ def build_system_prompt(actionSummary: str = "", benchmarkInstruction: str = "")
         Here is the current game state:
         """
 
+def build_system_prompt(benchmarkInstruction: str = "") -> str:
+    """Constructs the base system prompt for the LLM; it stays fixed for the whole run."""
+    return _PROMPT_HEAD + benchmarkInstruction + _PROMPT_TAIL
+
+def build_summary_prompt(actionSummary: str) -> str:
+    """Separate system message carrying the latest summary, sent after the base prompt."""
+    return f"Your previous actions summary: {actionSummary}"
+
 def get_summary_prompt():
     return """
         You are a summarization engine. Condense the below conversation into a concise summary that explains the previous actions taken by the assistant player.
@@ -1,224 +1,248 @@
 from enum import IntEnum
 
+# internal species id -> (dex_no, name, type1, type2), built once at import
+_SPECIES_MAP = {
+    # Glitch / MissingNo. Entries (No Pokédex Number)
+    0x00: (None, "'M (glitch)", "Bird", "Normal"),
+    0x1F: (None, "MissingNo. (Gyaoon)", "Bird", "Normal"),
+    0x20: (None, "MissingNo. (Nidoran♂-like Pokémon)", "Bird", "Normal"),
+    0x32: (None, "MissingNo. (Balloonda)", "Bird", "Normal"),
+    0x34: (None, "MissingNo. (Buu)", "Bird", "Normal"),
+    0x38: (None, "MissingNo. (Deer)", "Bird", "Normal"),
+    0x3D: (None, "MissingNo. (Elephant Pokémon)", "Bird", "Normal"),
+    0x3E: (None, "MissingNo. (Crocky)", "Bird", "Normal"),
+    0x3F: (None, "MissingNo. (Squid Pokémon 1)", "Bird", "Normal"),
+    0x43: (None, "MissingNo. (Cactus)", "Bird", "Normal"),
+    0x44: (None, "MissingNo. (Jaggu)", "Bird", "Normal"),
+    0x45: (None, "MissingNo. (Zubat pre-evo)", "Bird", "Normal"),
+    0x4F: (None, "MissingNo. (Fish Pokémon 1)", "Bird", "Normal"),
+    0x50: (None, "MissingNo. (Fish Pokémon 2)", "Bird", "Normal"),
+    0x51: (None, "MissingNo. (Vulpix pre-evo)", "Bird", "Normal"),
+    0x56: (None, "MissingNo. (Frog-like Pokémon 1)", "Bird", "Normal"),
+    0x57: (None, "MissingNo. (Frog-like Pokémon 2)", "Bird", "Normal"),
+    0x5E: (None, "MissingNo. (Lizard Pokémon 2)", "Bird", "Normal"),
+    0x5F: (None, "MissingNo. (Lizard Pokémon 3)", "Bird", "Normal"),
+    0x73: (None, "MissingNo. [Unknown]", "Bird", "Normal"),
+    0x79: (None, "MissingNo. [Unknown]", "Bird", "Normal"),
+    0x7A: (None, "MissingNo. (Squid Pokémon 2)", "Bird", "Normal"),
+    0x7F: (None, "MissingNo. (Golduck mid-evo)", "Bird", "Normal"),
+    0x86: (None, "MissingNo. (Meowth pre-evo)", "Bird", "Normal"),
+    0x87: (None, "MissingNo. [Unknown]", "Bird", "Normal"),
+    0x89: (None, "MissingNo. (Gyaoon pre-evo)", "Bird", "Normal"),
+    0x8C: (None, "MissingNo. (Magneton-like Pokémon)", "Bird", "Normal"),
+    0x92: (None, "MissingNo. (Marowak evo)", "Bird", "Normal"),
+    0x9C: (None, "MissingNo. (Goldeen pre-evo)", "Bird", "Normal"),
+    0x9F: (None, "MissingNo. (Kotora)", "Bird", "Normal"),
+    0xA0: (None, "MissingNo. (Raitora)", "Bird", "Normal"),
+    0xA1: (None, "MissingNo. (Raitora evo)", "Bird", "Normal"),
+    0xA2: (None, "MissingNo. (Ponyta pre-evo)", "Bird", "Normal"),
+    0xAC: (None, "MissingNo. (Blastoise-like Pokémon)", "Bird", "Normal"),
+    0xAE: (None, "MissingNo. (Lizard Pokémon 1)", "Bird", "Normal"),
+    0xAF: (None, "MissingNo. (Gorochu)", "Bird", "Normal"),
+    0xB5: (None, "MissingNo. (Original Wartortle evo)", "Bird", "Normal"),
+    0xB6: (None, "MissingNo. (Kabutops Fossil)", "Bird", "Normal"),
+    0xB7: (None, "MissingNo. (Aerodactyl Fossil)", "Bird", "Normal"),
+    0xB8: (None, "MissingNo. (Pokémon Tower Ghost)", "Bird", "Normal"),
+
+    # Pokédex Order
+    0x99: (1, "Bulbasaur", "Grass", "Poison"),
+    0x09: (2, "Ivysaur", "Grass", "Poison"),
+    0x9A: (3, "Venusaur", "Grass", "Poison"),
+    0xB0: (4, "Charmander", "Fire", None),
+    0xB2: (5, "Charmeleon", "Fire", None),
+    0xB4: (6, "Charizard", "Fire", "Flying"),
+    0xB1: (7, "Squirtle", "Water", None),
+    0xB3: (8, "Wartortle", "Water", None),
+    0x1C: (9, "Blastoise", "Water", None),
+    0x7B: (10, "Caterpie", "Bug", None),
+    0x7C: (11, "Metapod", "Bug", None),
+    0x7D: (12, "Butterfree", "Bug", "Flying"),
+    0x70: (13, "Weedle", "Bug", "Poison"),
+    0x71: (14, "Kakuna", "Bug", "Poison"),
+    0x72: (15, "Beedrill", "Bug", "Poison"),
+    0x24: (16, "Pidgey", "Normal", "Flying"),
+    0x96: (17, "Pidgeotto", "Normal", "Flying"),
+    0x97: (18, "Pidgeot", "Normal", "Flying"),
+    0xA5: (19, "Rattata", "Normal", None),
+    0xA6: (20, "Raticate", "Normal", None),
+    0x05: (21, "Spearow", "Normal", "Flying"),
+    0x23: (22, "Fearow", "Normal", "Flying"),
+    0x6C: (23, "Ekans", "Poison", None),
+    0x2D: (24, "Arbok", "Poison", None),
+    0x54: (25, "Pikachu", "Electric", None),
+    0x55: (26, "Raichu", "Electric", None),
+    0x60: (27, "Sandshrew", "Ground", None),
+    0x61: (28, "Sandslash", "Ground", None),
+    0x0F: (29, "Nidoran♀", "Poison", None),
+    0xA8: (30, "Nidorina", "Poison", None),
+    0x10: (31, "Nidoqueen", "Poison", "Ground"),
+    0x03: (32, "Nidoran♂", "Poison", None),
+    0xA7: (33, "Nidorino", "Poison", None),
+    0x07: (34, "Nidoking", "Poison", "Ground"),
+    0x04: (35, "Clefairy", "Normal", None),
+    0x8E: (36, "Clefable", "Normal", None),
+    0x52: (37, "Vulpix", "Fire", None),
+    0x53: (38, "Ninetales", "Fire", None),
+    0x64: (39, "Jigglypuff", "Normal", None),
+    0x65: (40, "Wigglytuff", "Normal", None),
+    0x6B: (41, "Zubat", "Poison", "Flying"),
+    0x82: (42, "Golbat", "Poison", "Flying"),
+    0xB9: (43, "Oddish", "Grass", "Poison"),
+    0xBA: (44, "Gloom", "Grass", "Poison"),
+    0xBB: (45, "Vileplume", "Grass", "Poison"),
+    0x6D: (46, "Paras", "Bug", "Grass"),
+    0x2E: (47, "Parasect", "Bug", "Grass"),
+    0x41: (48, "Venonat", "Bug", "Poison"),
+    0x77: (49, "Venomoth", "Bug", "Poison"),
+    0x3B: (50, "Diglett", "Ground", None),
+    0x76: (51, "Dugtrio", "Ground", None),
+    0x4D: (52, "Meowth", "Normal", None),
+    0x90: (53, "Persian", "Normal", None),
+    0x2F: (54, "Psyduck", "Water", None),
+    0x80: (55, "Golduck", "Water", None),
+    0x39: (56, "Mankey", "Fighting", None),
+    0x75: (57, "Primeape", "Fighting", None),
+    0x21: (58, "Growlithe", "Fire", None),
+    0x14: (59, "Arcanine", "Fire", None),
+    0x47: (60, "Poliwag", "Water", None),
+    0x6E: (61, "Poliwhirl", "Water", None),
+    0x6F: (62, "Poliwrath", "Water", "Fighting"),
+    0x94: (63, "Abra", "Psychic", None),
+    0x26: (64, "Kadabra", "Psychic", None),
+    0x95: (65, "Alakazam", "Psychic", None),
+    0x6A: (66, "Machop", "Fighting", None),
+    0x29: (67, "Machoke", "Fighting", None),
+    0x7E: (68, "Machamp", "Fighting", None),
+    0xBC: (69, "Bellsprout", "Grass", "Poison"),
+    0xBD: (70, "Weepinbell", "Grass", "Poison"),
+    0xBE: (71, "Victreebel", "Grass", "Poison"),
+    0x18: (72, "Tentacool", "Water", "Poison"),
+    0x9B: (73, "Tentacruel", "Water", "Poison"),
+    0xA9: (74, "Geodude", "Rock", "Ground"),
+    0x27: (75, "Graveler", "Rock", "Ground"),
+    0x31: (76, "Golem", "Rock", "Ground"),
+    0xA3: (77, "Ponyta", "Fire", None),
+    0xA4: (78, "Rapidash", "Fire", None),
+    0x25: (79, "Slowpoke", "Water", "Psychic"),
+    0x08: (80, "Slowbro", "Water", "Psychic"),
+    0xAD: (81, "Magnemite", "Electric", None),
+    0x36: (82, "Magneton", "Electric", None),
+    0x40: (83, "Farfetch'd", "Normal", "Flying"),
+    0x46: (84, "Doduo", "Normal", "Flying"),
+    0x74: (85, "Dodrio", "Normal", "Flying"),
+    0x3A: (86, "Seel", "Water", None),
+    0x78: (87, "Dewgong", "Water", "Ice"),
+    0x0D: (88, "Grimer", "Poison", None),
+    0x88: (89, "Muk", "Poison", None),
+    0x17: (90, "Shellder", "Water", None),
+    0x8B: (91, "Cloyster", "Water", "Ice"),
+    0x19: (92, "Gastly", "Ghost", "Poison"),
+    0x93: (93, "Haunter", "Ghost", "Poison"),
+    0x0E: (94, "Gengar", "Ghost", "Poison"),
+    0x22: (95, "Onix", "Rock", "Ground"),
+    0x30: (96, "Drowzee", "Psychic", None),
+    0x81: (97, "Hypno", "Psychic", None),
+    0x4E: (98, "Krabby", "Water", None),
+    0x8A: (99, "Kingler", "Water", None),
+    0x06: (100, "Voltorb", "Electric", None),
+    0x8D: (101, "Electrode", "Electric", None),
+    0x0C: (102, "Exeggcute", "Grass", "Psychic"),
+    0x0A: (103, "Exeggutor", "Grass", "Psychic"),
+    0x11: (104, "Cubone", "Ground", None),
+    0x91: (105, "Marowak", "Ground", None),
+    0x2B: (106, "Hitmonlee", "Fighting", None),
+    0x2C: (107, "Hitmonchan", "Fighting", None),
+    0x0B: (108, "Lickitung", "Normal", None),
+    0x37: (109, "Koffing", "Poison", None),
+    0x8F: (110, "Weezing", "Poison", None),
+    0x12: (111, "Rhyhorn", "Ground", "Rock"),
+    0x01: (112, "Rhydon", "Ground", "Rock"),
+    0x28: (113, "Chansey", "Normal", None),
+    0x1E: (114, "Tangela", "Grass", None),
+    0x02: (115, "Kangaskhan", "Normal", None),
+    0x5C: (116, "Horsea", "Water", None),
+    0x5D: (117, "Seadra", "Water", None),
+    0x9D: (118, "Goldeen", "Water", None),
+    0x9E: (119, "Seaking", "Water", None),
+    0x1B: (120, "Staryu", "Water", None),
+    0x98: (121, "Starmie", "Water", "Psychic"),
+    0x2A: (122, "Mr. Mime", "Psychic", None),
+    0x1A: (123, "Scyther", "Bug", "Flying"),
+    0x48: (124, "Jynx", "Ice", "Psychic"),
+    0x35: (125, "Electabuzz", "Electric", None),
+    0x33: (126, "Magmar", "Fire", None),
+    0x1D: (127, "Pinsir", "Bug", None),
+    0x3C: (128, "Tauros", "Normal", None),
+    0x85: (129, "Magikarp", "Water", None),
+    0x16: (130, "Gyarados", "Water", "Flying"),
+    0x13: (131, "Lapras", "Water", "Ice"),
+    0x4C: (132, "Ditto", "Normal", None),
+    0x66: (133, "Eevee", "Normal", None),
+    0x69: (134, "Vaporeon", "Water", None),
+    0x68: (135, "Jolteon", "Electric", None),
+    0x67: (136, "Flareon", "Fire", None),
+    0xAA: (137, "Porygon", "Normal", None),
+    0x62: (138, "Omanyte", "Rock", "Water"),
+    0x63: (139, "Omastar", "Rock", "Water"),
+    0x5A: (140, "Kabuto", "Rock", "Water"),
+    0x5B: (141, "Kabutops", "Rock", "Water"),
+    0xAB: (142, "Aerodactyl", "Rock", "Flying"),
+    0x84: (143, "Snorlax", "Normal", None),
+    0x4A: (144, "Articuno", "Ice", "Flying"),
+    0x4B: (145, "Zapdos", "Electric", "Flying"),
+    0x49: (146, "Moltres", "Fire", "Flying"),
+    0x58: (147, "Dratini", "Dragon", None),
+    0x59: (148, "Dragonair", "Dragon", None),
+    0x42: (149, "Dragonite", "Dragon", "Flying"),
+    0x83: (150, "Mewtwo", "Psychic", None),
+    0x15: (151, "Mew", "Psychic", None),
+}
+
 def get_species_map():
   """
   Returns a dictionary mapping internal Pokémon Red/Blue IDs (hex)
   to a tuple containing: (Pokédex number, Name, Type1, Type2).
   Type2 is None if the Pokémon has only one type.
   """
-  return {
-        # Glitch / MissingNo. Entries (No Pokédex Number)
-        0x00: (None, "'M (glitch)", "Bird", "Normal"),
-        0x1F: (None, "MissingNo. (Gyaoon)", "Bird", "Normal"),
-        0x20: (None, "MissingNo. (Nidoran♂-like Pokémon)", "Bird", "Normal"),
-        0x32: (None, "MissingNo. (Balloonda)", "Bird", "Normal"),
-        0x34: (None, "MissingNo. (Buu)", "Bird", "Normal"),
-        0x38: (None, "MissingNo. (Deer)", "Bird", "Normal"),
-        0x3D: (None, "MissingNo. (Elephant Pokémon)", "Bird", "Normal"),
-        0x3E: (None, "MissingNo. (Crocky)", "Bird", "Normal"),
-        0x3F: (None, "MissingNo. (Squid Pokémon 1)", "Bird", "Normal"),
-        0x43: (None, "MissingNo. (Cactus)", "Bird", "Normal"),
-        0x44: (None, "MissingNo. (Jaggu)", "Bird", "Normal"),
-        0x45: (None, "MissingNo. (Zubat pre-evo)", "Bird", "Normal"),
-        0x4F: (None, "MissingNo. (Fish Pokémon 1)", "Bird", "Normal"),
-        0x50: (None, "MissingNo. (Fish Pokémon 2)", "Bird", "Normal"),
-        0x51: (None, "MissingNo. (Vulpix pre-evo)", "Bird", "Normal"),
-        0x56: (None, "MissingNo. (Frog-like Pokémon 1)", "Bird", "Normal"),
-        0x57: (None, "MissingNo. (Frog-like Pokémon 2)", "Bird", "Normal"),
-        0x5E: (None, "MissingNo. (Lizard Pokémon 2)", "Bird", "Normal"),
-        0x5F: (None, "MissingNo. (Lizard Pokémon 3)", "Bird", "Normal"),
-        0x73: (None, "MissingNo. [Unknown]", "Bird", "Normal"),
-        0x79: (None, "MissingNo. [Unknown]", "Bird", "Normal"),
-        0x7A: (None, "MissingNo. (Squid Pokémon 2)", "Bird", "Normal"),
-        0x7F: (None, "MissingNo. (Golduck mid-evo)", "Bird", "Normal"),
-        0x86: (None, "MissingNo. (Meowth pre-evo)", "Bird", "Normal"),
-        0x87: (None, "MissingNo. [Unknown]", "Bird", "Normal"),
-        0x89: (None, "MissingNo. (Gyaoon pre-evo)", "Bird", "Normal"),
-        0x8C: (None, "MissingNo. (Magneton-like Pokémon)", "Bird", "Normal"),
-        0x92: (None, "MissingNo. (Marowak evo)", "Bird", "Normal"),
-        0x9C: (None, "MissingNo. (Goldeen pre-evo)", "Bird", "Normal"),
-        0x9F: (None, "MissingNo. (Kotora)", "Bird", "Normal"),
-        0xA0: (None, "MissingNo. (Raitora)", "Bird", "Normal"),
-        0xA1: (None, "MissingNo. (Raitora evo)", "Bird", "Normal"),
-        0xA2: (None, "MissingNo. (Ponyta pre-evo)", "Bird", "Normal"),
-        0xAC: (None, "MissingNo. (Blastoise-like Pokémon)", "Bird", "Normal"),
-        0xAE: (None, "MissingNo. (Lizard Pokémon 1)", "Bird", "Normal"),
-        0xAF: (None, "MissingNo. (Gorochu)", "Bird", "Normal"),
-        0xB5: (None, "MissingNo. (Original Wartortle evo)", "Bird", "Normal"),
-        0xB6: (None, "MissingNo. (Kabutops Fossil)", "Bird", "Normal"),
-        0xB7: (None, "MissingNo. (Aerodactyl Fossil)", "Bird", "Normal"),
-        0xB8: (None, "MissingNo. (Pokémon Tower Ghost)", "Bird", "Normal"),
+  return _SPECIES_MAP
+
+# same data as a flat 256-entry table indexed by the (one-byte) internal id;
+# ids with no entry get a placeholder name instead of needing a .get() default
+_SPECIES_BY_ID = tuple(
+    _SPECIES_MAP.get(i, (None, f"ID 0x{i:02X}", None, None)) for i in range(256)
+)
+
+def get_species_table():
+  """
+  Returns a 256-entry tuple indexed by internal ID, each element a
+  (Pokédex number, Name, Type1, Type2) tuple as in get_species_map().
+  """
+  return _SPECIES_BY_ID
 
-        # Pokédex Order
-        0x99: (1, "Bulbasaur", "Grass", "Poison"),
-        0x09: (2, "Ivysaur", "Grass", "Poison"),
-        0x9A: (3, "Venusaur", "Grass", "Poison"),
-        0xB0: (4, "Charmander", "Fire", None),
-        0xB2: (5, "Charmeleon", "Fire", None),
-        0xB4: (6, "Charizard", "Fire", "Flying"),
-        0xB1: (7, "Squirtle", "Water", None),
-        0xB3: (8, "Wartortle", "Water", None),
-        0x1C: (9, "Blastoise", "Water", None),
-        0x7B: (10, "Caterpie", "Bug", None),
-        0x7C: (11, "Metapod", "Bug", None),
-        0x7D: (12, "Butterfree", "Bug", "Flying"),
-        0x70: (13, "Weedle", "Bug", "Poison"),
-        0x71: (14, "Kakuna", "Bug", "Poison"),
-        0x72: (15, "Beedrill", "Bug", "Poison"),
-        0x24: (16, "Pidgey", "Normal", "Flying"),
-        0x96: (17, "Pidgeotto", "Normal", "Flying"),
-        0x97: (18, "Pidgeot", "Normal", "Flying"),
-        0xA5: (19, "Rattata", "Normal", None),
-        0xA6: (20, "Raticate", "Normal", None),
-        0x05: (21, "Spearow", "Normal", "Flying"),
-        0x23: (22, "Fearow", "Normal", "Flying"),
-        0x6C: (23, "Ekans", "Poison", None),
-        0x2D: (24, "Arbok", "Poison", None),
-        0x54: (25, "Pikachu", "Electric", None),
-        0x55: (26, "Raichu", "Electric", None),
-        0x60: (27, "Sandshrew", "Ground", None),
-        0x61: (28, "Sandslash", "Ground", None),
-        0x0F: (29, "Nidoran♀", "Poison", None),
-        0xA8: (30, "Nidorina", "Poison", None),
-        0x10: (31, "Nidoqueen", "Poison", "Ground"),
-        0x03: (32, "Nidoran♂", "Poison", None),
-        0xA7: (33, "Nidorino", "Poison", None),
-        0x07: (34, "Nidoking", "Poison", "Ground"),
-        0x04: (35, "Clefairy", "Normal", None),
-        0x8E: (36, "Clefable", "Normal", None),
-        0x52: (37, "Vulpix", "Fire", None),
-        0x53: (38, "Ninetales", "Fire", None),
-        0x64: (39, "Jigglypuff", "Normal", None),
-        0x65: (40, "Wigglytuff", "Normal", None),
-        0x6B: (41, "Zubat", "Poison", "Flying"),
-        0x82: (42, "Golbat", "Poison", "Flying"),
-        0xB9: (43, "Oddish", "Grass", "Poison"),
-        0xBA: (44, "Gloom", "Grass", "Poison"),
-        0xBB: (45, "Vileplume", "Grass", "Poison"),
-        0x6D: (46, "Paras", "Bug", "Grass"),
-        0x2E: (47, "Parasect", "Bug", "Grass"),
-        0x41: (48, "Venonat", "Bug", "Poison"),
-        0x77: (49, "Venomoth", "Bug", "Poison"),
-        0x3B: (50, "Diglett", "Ground", None),
-        0x76: (51, "Dugtrio", "Ground", None),
-        0x4D: (52, "Meowth", "Normal", None),
-        0x90: (53, "Persian", "Normal", None),
-        0x2F: (54, "Psyduck", "Water", None),
-        0x80: (55, "Golduck", "Water", None),
-        0x39: (56, "Mankey", "Fighting", None),
-        0x75: (57, "Primeape", "Fighting", None),
-        0x21: (58, "Growlithe", "Fire", None),
-        0x14: (59, "Arcanine", "Fire", None),
-        0x47: (60, "Poliwag", "Water", None),
-        0x6E: (61, "Poliwhirl", "Water", None),
-        0x6F: (62, "Poliwrath", "Water", "Fighting"),
-        0x94: (63, "Abra", "Psychic", None),
-        0x26: (64, "Kadabra", "Psychic", None),
-        0x95: (65, "Alakazam", "Psychic", None),
-        0x6A: (66, "Machop", "Fighting", None),
-        0x29: (67, "Machoke", "Fighting", None),
-        0x7E: (68, "Machamp", "Fighting", None),
-        0xBC: (69, "Bellsprout", "Grass", "Poison"),
-        0xBD: (70, "Weepinbell", "Grass", "Poison"),
-        0xBE: (71, "Victreebel", "Grass", "Poison"),
-        0x18: (72, "Tentacool", "Water", "Poison"),
-        0x9B: (73, "Tentacruel", "Water", "Poison"),
-        0xA9: (74, "Geodude", "Rock", "Ground"),
-        0x27: (75, "Graveler", "Rock", "Ground"),
-        0x31: (76, "Golem", "Rock", "Ground"),
-        0xA3: (77, "Ponyta", "Fire", None),
-        0xA4: (78, "Rapidash", "Fire", None),
-        0x25: (79, "Slowpoke", "Water", "Psychic"),
-        0x08: (80, "Slowbro", "Water", "Psychic"),
-        0xAD: (81, "Magnemite", "Electric", None),
-        0x36: (82, "Magneton", "Electric", None),
-        0x40: (83, "Farfetch'd", "Normal", "Flying"),
-        0x46: (84, "Doduo", "Normal", "Flying"),
-        0x74: (85, "Dodrio", "Normal", "Flying"),
-        0x3A: (86, "Seel", "Water", None),
-        0x78: (87, "Dewgong", "Water", "Ice"),
-        0x0D: (88, "Grimer", "Poison", None),
-        0x88: (89, "Muk", "Poison", None),
-        0x17: (90, "Shellder", "Water", None),
-        0x8B: (91, "Cloyster", "Water", "Ice"),
-        0x19: (92, "Gastly", "Ghost", "Poison"),
-        0x93: (93, "Haunter", "Ghost", "Poison"),
-        0x0E: (94, "Gengar", "Ghost", "Poison"),
-        0x22: (95, "Onix", "Rock", "Ground"),
-        0x30: (96, "Drowzee", "Psychic", None),
-        0x81: (97, "Hypno", "Psychic", None),
-        0x4E: (98, "Krabby", "Water", None),
-        0x8A: (99, "Kingler", "Water", None),
-        0x06: (100, "Voltorb", "Electric", None),
-        0x8D: (101, "Electrode", "Electric", None),
-        0x0C: (102, "Exeggcute", "Grass", "Psychic"),
-        0x0A: (103, "Exeggutor", "Grass", "Psychic"),
-        0x11: (104, "Cubone", "Ground", None),
-        0x91: (105, "Marowak", "Ground", None),
-        0x2B: (106, "Hitmonlee", "Fighting", None),
-        0x2C: (107, "Hitmonchan", "Fighting", None),
-        0x0B: (108, "Lickitung", "Normal", None),
-        0x37: (109, "Koffing", "Poison", None),
-        0x8F: (110, "Weezing", "Poison", None),
-        0x12: (111, "Rhyhorn", "Ground", "Rock"),
-        0x01: (112, "Rhydon", "Ground", "Rock"),
-        0x28: (113, "Chansey", "Normal", None),
-        0x1E: (114, "Tangela", "Grass", None),
-        0x02: (115, "Kangaskhan", "Normal", None),
-        0x5C: (116, "Horsea", "Water", None),
-        0x5D: (117, "Seadra", "Water", None),
-        0x9D: (118, "Goldeen", "Water", None),
-        0x9E: (119, "Seaking", "Water", None),
-        0x1B: (120, "Staryu", "Water", None),
-        0x98: (121, "Starmie", "Water", "Psychic"),
-        0x2A: (122, "Mr. Mime", "Psychic", None),
-        0x1A: (123, "Scyther", "Bug", "Flying"),
-        0x48: (124, "Jynx", "Ice", "Psychic"),
-        0x35: (125, "Electabuzz", "Electric", None),
-        0x33: (126, "Magmar", "Fire", None),
-        0x1D: (127, "Pinsir", "Bug", None),
-        0x3C: (128, "Tauros", "Normal", None),
-        0x85: (129, "Magikarp", "Water", None),
-        0x16: (130, "Gyarados", "Water", "Flying"),
-        0x13: (131, "Lapras", "Water", "Ice"),
-        0x4C: (132, "Ditto", "Normal", None),
-        0x66: (133, "Eevee", "Normal", None),
-        0x69: (134, "Vaporeon", "Water", None),
-        0x68: (135, "Jolteon", "Electric", None),
-        0x67: (136, "Flareon", "Fire", None),
-        0xAA: (137, "Porygon", "Normal", None),
-        0x62: (138, "Omanyte", "Rock", "Water"),
-        0x63: (139, "Omastar", "Rock", "Water"),
-        0x5A: (140, "Kabuto", "Rock", "Water"),
-        0x5B: (141, "Kabutops", "Rock", "Water"),
-        0xAB: (142, "Aerodactyl", "Rock", "Flying"),
-        0x84: (143, "Snorlax", "Normal", None),
-        0x4A: (144, "Articuno", "Ice", "Flying"),
-        0x4B: (145, "Zapdos", "Electric", "Flying"),
-        0x49: (146, "Moltres", "Fire", "Flying"),
-        0x58: (147, "Dratini", "Dragon", None),
-        0x59: (148, "Dragonair", "Dragon", None),
-        0x42: (149, "Dragonite", "Dragon", "Flying"),
-        0x83: (150, "Mewtwo", "Psychic", None),
-        0x15: (151, "Mew", "Psychic", None),
-    }
+# Gen 1 charset -> latin-1 byte, for bytes.translate; unknown codes become '?'
+_TEXT_TABLE = bytearray(b'?' * 256)
+_TEXT_TABLE[0x80:0x9A] = b'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_TEXT_TABLE[0xA0:0xBA] = b'abcdefghijklmnopqrstuvwxyz'
+_TEXT_TABLE[0x7F] = ord(' ')
+_TEXT_TABLE[0xE0] = 0xE9  # 'é' in latin-1
+_TEXT_TABLE = bytes(_TEXT_TABLE)
 
 def decode_pokemon_text(raw_bytes: bytes) -> str:
-    out = []
-    for b in raw_bytes:
-        if b == 0x50:
-            break
-        if 0x80 <= b <= 0x99:
-            out.append(chr(ord('A') + (b - 0x80)))
-        elif 0xA0 <= b <= 0xB9:
-            out.append(chr(ord('a') + (b - 0xA0)))
-        elif b == 0x7F:
-            out.append(' ')
-        elif b == 0xE0:
-            out.append('é')
-        else:
-            out.append('?')
-    return ''.join(out)
+    # 0x50 terminates the string; only decode what precedes it
+    name_bytes = raw_bytes.split(b'\x50', 1)[0]
+    return name_bytes.translate(_TEXT_TABLE).decode('latin-1')
+
+def decode_pokemon_texts(raw_bytes: bytes, size: int) -> list[str]:
+    """
+    Decode a run of fixed-size text fields (e.g. the party nickname table)
+    with a single translate/decode over the whole block.
+    """
+    text = raw_bytes.translate(_TEXT_TABLE).decode('latin-1')
+    names = []
+    for off in range(0, len(raw_bytes), size):
+        end = raw_bytes.find(b'\x50', off, off + size)
+        names.append(text[off:end if end != -1 else off + size])
+    return names
 
 class MapLocation(IntEnum):
     """Maps location IDs to their names"""
@@ -447,9 +471,8 @@ class MapLocation(IntEnum):
     BRUNO = 0xF6
     AGATHA = 0xF7
 
+_MAP_ID_TO_NAME = {m.value: m.name for m in MapLocation}
+
 def get_location_name(value: int) -> str | None:
     """Return the enum name for a given int, or None if invalid."""
-    try:
-        return MapLocation(value).name
-    except ValueError:
-        return None
+    return _MAP_ID_TO_NAME.get(value)
@@ -1,12 +1,57 @@
-import struct
-import time
+import copy
+from concurrent.futures import Future, ThreadPoolExecutor
 from pyAIAgent.game.graphics import dump_minimal_map, dump_minimap_map_array
-from pyAIAgent.utils.socket_utils import readrange, send_command, _flush_socket
+from pyAIAgent.utils.socket_utils import FRAME_CMD, readrange_cmd, readranges, send_command, _flush_socket, _readrange_raw
 from pyAIAgent.utils.image_utils import capture
-from pyAIAgent.game.data import get_species_map, get_location_name, decode_pokemon_text
+from pyAIAgent.game.data import get_species_table, get_location_name, decode_pokemon_texts
 
 DEFAULT_ROM = 'c.gbc'
 MINI_MAP_SIZE = (21,21)
+PARTY_MAX = 6
+
+# Party block at 0xD163: count + species list, then 44-byte mon structs
+# at +0x08, then OT names, then 10-byte nicknames at +0x152
+PARTY_DATA_OFFSET = 0x08
+PARTY_DATA_SIZE = 44
+PARTY_NAME_OFFSET = 0x152
+PARTY_NAME_SIZE = 10
+PARTY_BLOCK_SIZE = PARTY_NAME_OFFSET + PARTY_MAX * PARTY_NAME_SIZE
+
+# READRANGE requests for fixed WRAM addresses, encoded once
+_CMD_PARTY = readrange_cmd(0xD163, PARTY_BLOCK_SIZE)
+_CMD_BADGES = readrange_cmd(0xD356, 1)
+_CMD_FACING = readrange_cmd(0xC109, 1)
+_CMD_MAP_INFO = readrange_cmd(0xD35E, 12)
+_CMD_IN_BATTLE = readrange_cmd(0xD057, 1)
+_CMD_BATTLE_TYPE = readrange_cmd(0xD05A, 1)
+# frame counter + savestate-load count, framed like a READRANGE reply
+_CMD_FRAME = FRAME_CMD
+
+# offsets into the map info block at 0xD35E
+MAP_ID_OFFSET = 0xD35E - 0xD35E
+TILE_Y_OFFSET = 0xD361 - 0xD35E
+TILE_X_OFFSET = 0xD362 - 0xD35E
+MAP_WIDTH_OFFSET = 0xD369 - 0xD35E
+
+# ROM-only map work (minimap render, 2D walkability array); never touches
+# the socket, which stays on the caller's thread
+_MAP_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="minimap")
+
+# PNG writes started by the last prep_llm(); see wait_for_saves()
+_pending_saves: list[Future] = []
+
+# last prep_llm() result and the FRAME reply it was built on
+_last_frame = None
+_last_result = None
+
+_BADGE_NAMES = ("Boulder", "Cascade", "Thunder", "Rainbow", "Soul", "Marsh", "Volcano", "Earth")
+# badge flag byte (0xD356) -> owned badge names; immutable so entries can be shared
+_BADGES_BY_FLAG = tuple(
+    tuple(n for i, n in enumerate(_BADGE_NAMES) if f & (1 << i)) for f in range(256)
+)
+
+# sprite facing bits (0xC109 & 0xC) -> direction, indexed by (raw >> 2) & 3
+_FACING = ("down", "up", "left", "right")
 
 def get_state(sock) -> str:
     _flush_socket(sock)
@@ -14,27 +59,27 @@ def get_state(sock) -> str:
 
 def get_party_text(sock) -> str:
     _flush_socket(sock)
+    # one round-trip for the whole block; slots are sliced out locally
+    return _parse_party(_readrange_raw(sock, _CMD_PARTY))
+
+def _parse_party(buf: bytes) -> list[dict]:
     party = []
-    header = readrange(sock, "0xD163", "8")
-    count = header[0]
-    species_map = get_species_map()
+    count = min(buf[0], PARTY_MAX)
+    species = get_species_table()
+    nicknames = decode_pokemon_texts(
+        buf[PARTY_NAME_OFFSET:PARTY_NAME_OFFSET + count * PARTY_NAME_SIZE], PARTY_NAME_SIZE)
     for slot in range(count):
-        data_addr = 0xD163 + 0x08 + slot * 44
-        name_addr = 0xD163 + 0x152 + slot * 10
-        d = readrange(sock, hex(data_addr), "44")
-        raw_name = readrange(sock, hex(name_addr), "10")
-        internal_id = header[1 + slot]
+        off = PARTY_DATA_OFFSET + slot * PARTY_DATA_SIZE
+        internal_id = buf[1 + slot]
 
         # Now expect 4-tuple: (dex_no, mon_name, type1, type2)
-        dex_no, mon_name, type1, type2 = species_map.get(
-            internal_id,
-            (None, f"ID 0x{internal_id:02X}", None, None)
-        )
+        dex_no, mon_name, type1, type2 = species[internal_id]
 
-        hp_cur = struct.unpack(">H", d[1:3])[0]
-        level = d[0x21]
-        hp_max = struct.unpack(">H", d[0x22:0x24])[0]
-        nickname = decode_pokemon_text(raw_name) or "(no nick)"
+        # big-endian u16 fields read straight out of the block, no slices
+        hp_cur = (buf[off + 0x01] << 8) | buf[off + 0x02]
+        level = buf[off + 0x21]
+        hp_max = (buf[off + 0x22] << 8) | buf[off + 0x23]
+        nickname = nicknames[slot] or "(no nick)"
 
         # Build a types string, e.g. "Grass/Poison" or just "Fire"
         types = type1 if type1 else ""
@@ -48,57 +93,93 @@ def get_party_text(sock) -> str:
 
 def get_badges_text(sock) -> str:
     _flush_socket(sock)
-    raw = readrange(sock, "0xD356", "1")
-    flags = raw[0]
-    names = ["Boulder","Cascade","Thunder","Rainbow","Soul","Marsh","Volcano","Earth"]
-    have = [names[i] for i in range(8) if flags & (1 << i)]
-    return have
+    return _parse_badges(_readrange_raw(sock, _CMD_BADGES))
+
+def _parse_badges(raw: bytes) -> list[str]:
+    # callers (state diff, UI payload, gymbench) expect a list
+    return list(_BADGES_BY_FLAG[raw[0]])
 
 
 def get_facing(sock) -> str:
     _flush_socket(sock)
-    raw = readrange(sock, "0xC109", "1")[0]
-    code = raw & 0xC
-    if code == 0x0:
-        return "down"
-    elif code == 0x4:
-        return "up"
-    elif code == 0x8:
-        return "left"
-    elif code == 0xC:
-        return "right"
-    else:
-        return f"unknown(0x{raw:02X})"
+    return _parse_facing(_readrange_raw(sock, _CMD_FACING))
+
+def _parse_facing(buf: bytes) -> str:
+    return _FACING[(buf[0] >> 2) & 3]
 
 
 def get_location(sock) -> tuple[int, int, int, str] | None:
     _flush_socket(sock)
-    mid = readrange(sock, "0xD35E", "1")[0]
+    # map id, tile y/x and map width all sit in 0xD35E..0xD369
+    buf = _readrange_raw(sock, _CMD_MAP_INFO)
+    loc = _parse_map_info(buf)
+    if loc is None:
+        return None
+    mid, tile_x, tile_y, mapName = loc
+    return (mid, tile_x, tile_y, get_facing(sock), mapName)
+
+def _parse_map_info(buf: bytes) -> tuple[int, int, int, str] | None:
+    mid = buf[MAP_ID_OFFSET]
     mapName = get_location_name(mid)
-    tile_x = readrange(sock, "0xD362", "1")[0]
-    tile_y = readrange(sock, "0xD361", "1")[0]
-    map_w_blocks = readrange(sock, "0xD369", "1")[0]
+    tile_x = buf[TILE_X_OFFSET]
+    tile_y = buf[TILE_Y_OFFSET]
+    map_w_blocks = buf[MAP_WIDTH_OFFSET]
     map_w_tiles = map_w_blocks * 2
     if map_w_tiles == 0:
         return None
-    facing = get_facing(sock)
-    return (mid, tile_x, tile_y, facing, mapName)
+    return (mid, tile_x, tile_y, mapName)
+
+
+def _render_minimap(mid: int, pos: tuple[int, int]) -> None:
+    minimap = dump_minimal_map(DEFAULT_ROM, mid, pos, grid_lines=True, crop=MINI_MAP_SIZE)
+    if minimap is None:
+        # ROM/map lookup failed → empty map, same as having no map data
+        open("minimap.png", "wb").close()
+        return
+    minimap.save("minimap.png")
+
+
+def wait_for_saves() -> None:
+    """Block until latest.png / minimap.png from the last prep_llm() are written."""
+    while _pending_saves:
+        _pending_saves.pop().result()
 
 
 def prep_llm(sock) -> dict:
-    _flush_socket(sock)
-    capture(sock, "latest.png")
-    time.sleep(0.1)
-    _flush_socket(sock)
-    loc = get_location(sock)
+    """
+    Read the game state and start writing latest.png / minimap.png.
+    The PNGs are saved in the background; call wait_for_saves() before
+    reading them. If the emulator hasn't advanced a frame since the last
+    call, the previous result (and PNGs) are reused.
+    """
+    global _last_frame, _last_result
+    # don't let a previous tick's save land on top of this one's
+    wait_for_saves()
+    frame = _readrange_raw(sock, _CMD_FRAME)
+    if frame == _last_frame:
+        # same frame, same state: skip CAP, map rendering and PNG encodes;
+        # deep copy so callers can't change the memo through the party list
+        return copy.deepcopy(_last_result)
+
+    # screenshot first, then RAM, so the state sent with the picture is
+    # never from an earlier frame than it
+    _pending_saves.append(capture(sock, "latest.png"))
+
+    # every RAM read this tick goes out in one pipelined batch
+    map_buf, facing_buf, party_buf, badge_buf = readranges(
+        sock, (_CMD_MAP_INFO, _CMD_FACING, _CMD_PARTY, _CMD_BADGES))
+    loc = _parse_map_info(map_buf)
     mid = None
     mapName = None
-    map2D = ""
+    map2D_future = None
 
     if loc:
-        mid, x, y, facing, mapName = loc
-        dump_minimal_map(DEFAULT_ROM, mid, (x, y), grid_lines=True, crop=MINI_MAP_SIZE).save("minimap.png")
-        map2D = dump_minimap_map_array(DEFAULT_ROM, mid, (x, y), crop=MINI_MAP_SIZE)
+        mid, x, y, mapName = loc
+        facing = _parse_facing(facing_buf)
+        # the minimap only needs the ROM, so render it on the pool while
+        # the party and badges are parsed below
+        _pending_saves.append(_MAP_POOL.submit(_render_minimap, mid, (x, y)))
+        map2D_future = _MAP_POOL.submit(dump_minimap_map_array, DEFAULT_ROM, mid, (x, y), crop=MINI_MAP_SIZE)
         position = (x, y)
     else:
         # no map data or in battle → empty map
@@ -106,25 +187,27 @@ def prep_llm(sock) -> dict:
         position = None
         facing = None
 
-    return {
-        "party":   get_party_text(sock),
+    result = {
+        "party":   _parse_party(party_buf),
         "map_id": mid,
-        "badges":  get_badges_text(sock),
+        "badges":  _parse_badges(badge_buf),
         "position": position,
         "facing":  facing,
         "map_name": mapName,
-        "minimap_2d": map2D
+        "minimap_2d": map2D_future.result() if map2D_future else ""
     }
+    _last_frame, _last_result = frame, copy.deepcopy(result)
+    return result
 
 
 
 def print_battle(sock) -> None:
     _flush_socket(sock)
-    cur = readrange(sock, hex(0xD057), "1")[0]
+    cur = _readrange_raw(sock, _CMD_IN_BATTLE)[0]
     if cur == 0:
         print("Not currently in a battle.")
         return
-    b = readrange(sock, hex(0xD05A), "1")[0]
+    b = _readrange_raw(sock, _CMD_BATTLE_TYPE)[0]
     types = {
         0xF0: "Wild Battle",
         0xED: "Trainer Battle",
@@ -1,6 +1,8 @@
 import json
 import re
 
+_FENCE_RE = re.compile(r'```(?:json)?\s*\n(.*?)\n```', re.DOTALL | re.IGNORECASE)
+
 def parse_optional_fenced_json(text):
     """
     Parses JSON from `text`, which may be either:
@@ -14,8 +16,7 @@ def parse_optional_fenced_json(text):
         ValueError: if JSON parsing fails or (if fenced) no valid fence is found.
     """
     # Try to find a fenced JSON block first
-    fence_pattern = r'```(?:json)?\s*\n(.*?)\n```'
-    m = re.search(fence_pattern, text, flags=re.DOTALL | re.IGNORECASE)
+    m = _FENCE_RE.search(text)
     if m:
         json_str = m.group(1)
     else:
@@ -1,6 +1,7 @@
-import struct
 import pathlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from PIL import Image, ImageDraw
+from pyAIAgent.utils.socket_utils import _flush_socket, _recv_exact, _recv_into
 
 GBA_WIDTH = 240
 GBA_HEIGHT = 160
@@ -15,41 +16,68 @@ SIZE_MAP = {
     GB_RASTER_SIZE: (GB_WIDTH, GB_HEIGHT),
 }
 
-def capture(sock, filename: str = "latest.png", cell_size: int = 16) -> None:
-    from pyAIAgent.utils.socket_utils import _flush_socket
+# CAP frames are received into this one buffer instead of a fresh ~150 KB
+# bytearray per call; frombytes() copies out of it, so reuse is safe
+_CAP_BUF = bytearray(GBA_RASTER_SIZE)
+
+# (size, cell_size) -> 1-bit mask of the grid lines, drawn once per layout
+_GRID_MASKS = {}
+GRID_COLOR = (255, 0, 0, 128)  # semi-transparent red
+
+def _grid_mask(size: tuple[int, int], cell_size: int) -> Image.Image:
+    mask = _GRID_MASKS.get((size, cell_size))
+    if mask is None:
+        mask = Image.new("1", size, 0)
+        draw = ImageDraw.Draw(mask)
+        w, h = size
+        for x in range(0, w + 1, cell_size):
+            draw.line(((x, 0), (x, h)), fill=1)
+        for y in range(0, h + 1, cell_size):
+            draw.line(((0, y), (w, y)), fill=1)
+        _GRID_MASKS[(size, cell_size)] = mask
+    return mask
+
+# single writer so PNG encoding runs off the caller's thread but saves
+# to the same path never race each other
+_SAVE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="png-save")
+
+def save_image_async(img: Image.Image, path) -> Future:
+    """Encode and write `img` to `path` on the background save thread."""
+    return _SAVE_POOL.submit(img.save, path)
+
+def capture(sock, filename: str = "latest.png", cell_size: int = 16) -> Future:
+    """
+    Grab the current frame over CAP, overlay the grid and save it to `filename`.
+    The PNG is written in the background; wait on the returned future before
+    reading the file.
+    """
+    global _CAP_BUF
     # flush any leftover bytes
     _flush_socket(sock)
 
     sock.sendall(b"CAP\n")
-    hdr = sock.recv(4)
-    if len(hdr) < 4:
-        raise RuntimeError("socket closed during CAP header")
-    length = struct.unpack(">I", hdr)[0]
-
-    data = bytearray()
-    while len(data) < length:
-        chunk = sock.recv(length - len(data))
-        if not chunk:
-            raise RuntimeError("socket closed mid-image")
-        data.extend(chunk)
-
+    hdr = _recv_exact(sock, 4, "socket closed during CAP header")
+    length = int.from_bytes(hdr, "big")
+    # check before allocating or waiting: a non-frame reply (e.g. "ERR ...")
+    # read as a length would grow the buffer and block on bytes never sent
     size = SIZE_MAP.get(length)
     if size is None:
         raise RuntimeError(f"unexpected raster size {length} bytes")
 
-    # build image from raw data
-    img = Image.frombytes("RGBA", size, bytes(data), "raw", "ARGB")
+    if length > len(_CAP_BUF):
+        _CAP_BUF = bytearray(length)
+    data = memoryview(_CAP_BUF)[:length]
+    _recv_into(sock, data, "socket closed mid-image")
 
-    # draw the 16×16 grid
-    draw = ImageDraw.Draw(img)
-    w, h = img.size
-    grid_color = (255, 0, 0, 128)  # semi-transparent red
+    # build image straight from the receive buffer; the ARGB raw decoder
+    # copies into the image, so no intermediate bytes() copy is needed
+    # (frombuffer can't share it anyway: ARGB has to be unpacked to RGBA)
+    img = Image.frombytes("RGBA", size, data, "raw", "ARGB")
 
-    for x in range(0, w + 1, cell_size):
-        draw.line(((x, 0), (x, h)), fill=grid_color)
-    for y in range(0, h + 1, cell_size):
-        draw.line(((0, y), (w, y)), fill=grid_color)
+    # stamp the 16×16 grid: one masked paste of a cached line mask sets the
+    # same pixels to the same RGBA value as drawing each line did
+    img.paste(GRID_COLOR, mask=_grid_mask(size, cell_size))
 
     # save
     path = pathlib.Path(filename)
-    img.save(path)
+    return save_image_async(img, path)
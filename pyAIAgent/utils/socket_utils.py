@@ -1,50 +1,194 @@
+import os
+import socket
 import struct
 
-def _flush_socket(sock) -> None:
-    """
-    Drain any pending data from sock so that our next recv()
-    only sees the fresh response to the command we send.
-    """
-    # Switch to non-blocking so recv() returns immediately if no data
-    sock.setblocking(False)
-    try:
-        while True:
-            data = sock.recv(4096)
-            if not data:
-                break
-    except (BlockingIOError, OSError):
-        # No more data to read
-        pass
-    finally:
-        # Go back to blocking mode
-        sock.setblocking(True)
-
-def readrange(sock, address: str, length: str) -> bytes:
+
+def connect_emulator(port: int, unix_path: str | None = None, timeout: float = 2):
+    """
+    Connect to the emulator script. If `unix_path` names an existing Unix
+    domain socket it is tried first (skips the loopback TCP stack);
+    otherwise, or if that fails, connect over TCP to localhost:`port`.
+    """
+    if unix_path and hasattr(socket, "AF_UNIX") and os.path.exists(unix_path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(unix_path)
+            return sock
+        except OSError:
+            sock.close()
+    # create_connection handles both IPv4/IPv6
+    return socket.create_connection(('localhost', port), timeout=timeout)
+
+
+SOCK_BUF_SIZE = 256 * 1024
+
+def setup_sock(sock) -> None:
+    """
+    Tune a freshly connected emulator socket; call once after connect.
+    Every request here is a tiny write waiting on a reply, so Nagle's
+    coalescing only adds delay. Keepalive lets a long-idle session notice
+    a vanished emulator instead of hanging on the next read.
+    """
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # room for a whole CAP frame (~150 KB) plus the pipelined READRANGE
+    # replies; the kernel may round or cap these, which is fine
+    for opt in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, opt, SOCK_BUF_SIZE)
+        except OSError:
+            pass
+
+
+if hasattr(socket, "MSG_DONTWAIT"):
+    def _flush_socket(sock) -> None:
+        """
+        Drain any pending data from sock so that our next recv()
+        only sees the fresh response to the command we send.
+        """
+        try:
+            # MSG_DONTWAIT makes each recv() non-blocking on its own, so the
+            # socket's blocking mode (and any timeout) is never touched
+            while sock.recv(4096, socket.MSG_DONTWAIT):
+                pass
+        except (BlockingIOError, OSError):
+            # No more data to read
+            pass
+else:
+    # Windows has no MSG_DONTWAIT; toggle the socket's blocking mode instead
+    def _flush_socket(sock) -> None:
+        """
+        Drain any pending data from sock so that our next recv()
+        only sees the fresh response to the command we send.
+        """
+        # Switch to non-blocking so recv() returns immediately if no data
+        sock.setblocking(False)
+        try:
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+        except (BlockingIOError, OSError):
+            # No more data to read
+            pass
+        finally:
+            # Go back to blocking mode
+            sock.setblocking(True)
+
+def _recv_exact(sock, size: int, closed_msg: str) -> bytearray:
+    """
+    Receive exactly `size` bytes into a preallocated buffer.
+    Raises RuntimeError(closed_msg) if the peer closes early.
+    """
+    buf = bytearray(size)
+    _recv_into(sock, memoryview(buf), closed_msg)
+    return buf
+
+# let the kernel wait for the whole payload in one recv where supported; the
+# loop below still covers short returns (signals, timeouts, no MSG_WAITALL)
+_RECV_FLAGS = getattr(socket, "MSG_WAITALL", 0)
+
+def _recv_into(sock, view: memoryview, closed_msg: str) -> None:
+    """Fill all of `view` from sock, e.g. a slice of a reused buffer."""
+    size = len(view)
+    off = 0
+    while off < size:
+        n = sock.recv_into(view[off:], 0, _RECV_FLAGS)
+        if not n:
+            raise RuntimeError(closed_msg)
+        off += n
+
+# binary READRANGE frame: opcode, u32 address, u32 length (big-endian)
+_OP_READRANGE = 0x01
+_RR_PKT = struct.Struct(">BII")
+
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+def _parse_int(value) -> int:
+    """
+    Accept ints, "0x"-prefixed hex ("0xD163") or plain decimal ("44",
+    "012"); anything else raises ValueError rather than being guessed at.
+    """
+    if isinstance(value, int):
+        return value
+    text = value.strip()
+    digits = text[2:]
+    if text[:2].lower() == "0x" and digits and all(c in _HEX_DIGITS for c in digits):
+        return int(digits, 16)
+    if text.isascii() and text.isdecimal():
+        return int(text, 10)
+    raise ValueError(f"expected decimal or 0x-prefixed hex, got {value!r}")
+
+def readrange_cmd(address, length) -> bytes:
+    """Build the wire form of a READRANGE request, e.g. for module constants."""
+    return _RR_PKT.pack(_OP_READRANGE, _parse_int(address), _parse_int(length))
+
+def readrange(sock, address, length) -> bytearray:
+    return _readrange_raw(sock, readrange_cmd(address, length))
+
+def _readrange_raw(sock, cmd: bytes) -> bytearray:
+    """READRANGE with a prebuilt command (see readrange_cmd)."""
     _flush_socket(sock)
-    cmd = f"READRANGE {address} {length}\n".encode('utf-8')
     sock.sendall(cmd)
-    hdr = sock.recv(4)
-    if len(hdr) < 4:
-        raise RuntimeError("socket closed during READRANGE header")
-    size = struct.unpack(">I", hdr)[0]
-    data = bytearray()
-    while len(data) < size:
-        chunk = sock.recv(size - len(data))
-        if not chunk:
-            raise RuntimeError("socket closed mid-dump")
-        data.extend(chunk)
-    return bytes(data)
+    return _recv_frame(sock, _reply_size(cmd))
+
+def readranges(sock, cmds) -> list[bytearray]:
+    """
+    Pipelined READRANGE: send every prebuilt command in one write, then
+    read the length-prefixed replies back in the same order. Any command
+    with a length-prefixed reply (e.g. FRAME) can ride along.
+    """
+    _flush_socket(sock)
+    sock.sendall(b"".join(cmds))
+    return [_recv_frame(sock, _reply_size(cmd)) for cmd in cmds]
+
+# frame counter + savestate-load count, framed like a READRANGE reply
+# (u32 + u32)
+FRAME_CMD = b"FRAME\n"
+_FRAME_REPLY_SIZE = 8
+
+def _reply_size(cmd: bytes) -> int | None:
+    """Payload length a framed command's reply must have, if known."""
+    if len(cmd) == _RR_PKT.size and cmd[0] == _OP_READRANGE:
+        return _RR_PKT.unpack(cmd)[2]
+    if cmd == FRAME_CMD:
+        return _FRAME_REPLY_SIZE
+    return None
+
+def _recv_frame(sock, expected: int | None = None) -> bytearray:
+    """
+    Read one length-prefixed (4-byte big-endian) reply. If `expected` is
+    given, a header announcing any other length (e.g. the first bytes of
+    an "ERR ..." line) raises before anything is allocated.
+    """
+    hdr = _recv_exact(sock, 4, "socket closed during READRANGE header")
+    size = int.from_bytes(hdr, "big")
+    if expected is not None and size != expected:
+        raise RuntimeError(f"READRANGE reply is {size} bytes, expected {expected} (header {bytes(hdr)!r})")
+    # hand back the receive buffer itself rather than a bytes() copy of it
+    return _recv_exact(sock, size, "socket closed mid-dump")
+
 
+REPLY_MAX = 4096  # line replies (state, OK/ERR ...) are far shorter
 
 def send_command(sock, cmd: str) -> str:
     _flush_socket(sock)
-    sock.sendall((cmd.strip() + "\n").encode('utf-8'))
-    data = bytearray()
+    sock.sendall((cmd.strip() + "\n").encode('ascii'))
+    # fill a fixed buffer and only scan the newly received bytes for '\n'
+    buf = bytearray(REPLY_MAX)
+    view = memoryview(buf)
+    end = 0
     while True:
-        chunk = sock.recv(4096)
-        if not chunk:
+        n = sock.recv_into(view[end:])
+        if not n:
             raise RuntimeError("socket closed before full response")
-        data.extend(chunk)
-        if b"\n" in chunk:
+        nl = buf.find(b"\n", end, end + n)
+        end += n
+        if nl != -1:
             break
-    return data.decode('utf-8').rstrip("\n")
+        if end == REPLY_MAX:
+            raise RuntimeError(f"response exceeds {REPLY_MAX} bytes without newline")
+    # replies are ASCII; error replies may echo back an unknown token
+    return buf[:nl].decode('ascii', errors='replace')
@@ -6,14 +6,15 @@ import os
 import sys
 import asyncio
 import logging
+import signal
 
 from pyAIAgent.utils.misc import parse_max_loops_fn
-from pyAIAgent.utils.socket_utils import send_command
+from pyAIAgent.utils.socket_utils import connect_emulator, send_command, setup_sock
 from pyAIAgent.game.state import DEFAULT_ROM
 from websocket_service import broadcast_message, run_server_forever as start_websocket_service
 from benchmark import load
 from interactive import interactive_console
-from llmdriver import run_auto_loop, MODEL
+from llmdriver import run_auto_loop, close_llm_clients, MODEL
 
 # --- Configuration (excluding WebSocket specific) ---
 import config
@@ -80,10 +81,10 @@ def start_mgba_with_scripting(rom_path=None, port=config.PORT):
     retries = 5
     for attempt in range(retries):
         try:
-            # create_connection handles both IPv4/IPv6
-            sock = socket.create_connection(('localhost', port), timeout=2)
+            sock = connect_emulator(port, config.UNIX_SOCKET, timeout=2)
             # Keep blocking for simplicity in current setup (console/llmdriver manage reads)
             sock.setblocking(True)
+            setup_sock(sock)
             log.info(f"Connected to mGBA scripting server on port {port}")
             if(config.LOAD_SAVESTATE): # Check the global config.LOAD_SAVESTATE flag
                 log.info("config.LOAD_SAVESTATE is True, attempting to load savestate 1.")
@@ -194,18 +195,25 @@ async def main_async(auto, max_loops_arg=None): # Added max_loops_arg
                     log.critical("Failed to load benchmark file: %s", e, exc_info=True)
                     sys.exit(1)
 
+            # SIGTERM ends the loop at its next wait (so benchmarks still finalize)
+            stop_event = asyncio.Event()
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+            except (NotImplementedError, AttributeError):
+                pass # no loop signal handlers on Windows
+
             # Start the LLM driver loop (passing the imported broadcast_message function)
             if max_loops_arg is not None:
                 send_command(sock, "INPUT_DISPLAY_ON")
                 log.info(f"Starting LLM driver loop (max_loops: {max_loops_arg})...")
                 llm_task = asyncio.create_task(
-                    run_auto_loop(sock, state, broadcast_message, interval=13.0, max_loops=max_loops_arg, benchmark=benchmark),
+                    run_auto_loop(sock, state, broadcast_message, interval=13.0, max_loops=max_loops_arg, benchmark=benchmark, stop_event=stop_event),
                     name="LLMDriverLoop"
                 )
             else:
                 log.info("Starting LLM driver loop...")
                 llm_task = asyncio.create_task(
-                    run_auto_loop(sock, state, broadcast_message, interval=13.0), # Original call
+                    run_auto_loop(sock, state, broadcast_message, interval=13.0, stop_event=stop_event), # Original call
                     name="LLMDriverLoop"
                 )
             tasks_to_await.append(llm_task)
@@ -259,6 +267,7 @@ async def main_async(auto, max_loops_arg=None): # Added max_loops_arg
         if pending_cancellations:
             await asyncio.gather(*pending_cancellations, return_exceptions=True)
 
+        await close_llm_clients()
         await shutdown_socket(sock, is_async = True)
         await terminate_process(proc, is_async = True)
         log.info("Async cleanup complete.")
@@ -3,6 +3,8 @@
 -- Start / Sel: S (START)  s (SELECT)
 -- Extra      : CAP  ➜ send ARGB raster (length header + pixels)
 --           : READRANGE <address> <length>  ➜ send memory bytes (length header + data)
+--           : 0x01 <addr:u32be> <len:u32be> ➜ binary READRANGE frame (9 bytes, same reply)
+--           : FRAME ➜ frame counter + savestate-load count (length header + 2×u32)
 --           : LOADSTATE <slot> [flags] ➜ load save state (flags default to 29)
 --           : INPUT_DISPLAY_ON ➜ control input display visibility
 -- Copy to …/mGBA.app/Contents/Resources/scripts/   Run with:
@@ -20,6 +22,7 @@ local QUEUE_SPACING = 30     -- frames between queued inputs
 --------------------------------------------------------------------------
 local socket, console, emu = socket, console, emu   -- mGBA globals
 local string_pack = string.pack                     -- Lua ≥5.3
+local string_unpack = string.unpack
 -- Globals needed for the input display feature later in the script
 local C, canvas, image, util, callbacks = C, canvas, image, util, callbacks
 
@@ -54,6 +57,7 @@ end
 --  INPUT DISPLAY CONTROL STATE & FUNCTION -------------------------------
 --------------------------------------------------------------------------
 local g_input_display_is_visible = false -- Default: Input display is OFF
+local g_state_loads = 0 -- bumped on every LOADSTATE so FRAME changes even if the frame counter rewinds
 
 local function setInputDisplayVisibility(visible)
     if g_input_display_is_visible == visible then
@@ -141,6 +145,7 @@ end
 --  SOCKET HOUSEKEEPING ----------------------------------------------------
 --------------------------------------------------------------------------
 local server, clients, nextID = nil, {}, 1
+local pending = {}   -- per-client partial line carried between receives
 local function log(id,m)   console:log  ("[INFO ] Socket "..id.." "..m) end
 local function err(id,m)   console:error("[ERROR] Socket "..id.." ERROR: "..m) end
 local function stop(id)
@@ -148,6 +153,7 @@ local function stop(id)
       log(id, "closing connection.")
       clients[id]:close();
       clients[id]=nil
+      pending[id]=nil
    else
        console:log("[DEBUG] stop: Attempted to stop non-existent client ID " .. id)
    end
@@ -224,11 +230,14 @@ local function sendCapture(sock, sockId)
    end
    local w,h = img.width, img.height
    console:log("[DEBUG] sendCapture: Captured image " .. w .. "x" .. h)
-   local buf = {}
+   -- pack a whole row per string.pack call instead of one string per pixel
+   local row_fmt = ">" .. string.rep("I4", w)
+   local row, buf = {}, {}
    for y=0,h-1 do
       for x=0,w-1 do
-         buf[#buf+1] = string_pack(">I4", img:getPixel(x,y))
+         row[x+1] = img:getPixel(x,y)
       end
+      buf[y+1] = string_pack(row_fmt, table.unpack(row, 1, w))
    end
    local data = table.concat(buf)
    local len_packed = string_pack(">I4", #data)
@@ -241,10 +250,11 @@ end
 --------------------------------------------------------------------------
 --  READRANGE --------------------------------------------------------------
 --------------------------------------------------------------------------
-local function sendReadRange(sock, sockId, addr_str, len_str)
-   console:log("[DEBUG] sendReadRange: Socket " .. sockId .. " requested READRANGE " .. addr_str .. " " .. len_str)
-   local addr   = tonumber(addr_str) or tonumber(addr_str, 16)
-   local length = tonumber(len_str)  or tonumber(len_str, 16)
+local OP_READRANGE   = 0x01   -- first byte of a binary READRANGE frame
+local RR_FRAME_LEN   = 9      -- opcode + u32 address + u32 length
+local RR_FRAME_FMT   = ">BI4I4"
+
+local function sendMemory(sock, sockId, addr, length)
    if not addr or not length or length < 1 then
       err(sockId, "Bad arguments for READRANGE: addr=" .. tostring(addr) .. ", len=" .. tostring(length))
       sock:send("ERR bad args\n")
@@ -264,6 +274,13 @@ local function sendReadRange(sock, sockId, addr_str, len_str)
    console:log("[DEBUG] sendReadRange: Memory data sent.")
 end
 
+local function sendReadRange(sock, sockId, addr_str, len_str)
+   console:log("[DEBUG] sendReadRange: Socket " .. sockId .. " requested READRANGE " .. addr_str .. " " .. len_str)
+   local addr   = tonumber(addr_str) or tonumber(addr_str, 16)
+   local length = tonumber(len_str)  or tonumber(len_str, 16)
+   sendMemory(sock, sockId, addr, length)
+end
+
 --------------------------------------------------------------------------
 --  COMMAND PARSER ---------------------------------------------------------
 --------------------------------------------------------------------------
@@ -289,6 +306,12 @@ local function parse(line, sock, sockId)
       return
    end
 
+   if line_upper == "FRAME" then
+      -- framed like READRANGE so it can be pipelined with memory reads
+      sock:send(string_pack(">I4I4I4", 8, emu:currentFrame(), g_state_loads))
+      return
+   end
+
    if line_upper == "INPUT_DISPLAY_ON" then
         console:log("[DEBUG] parse: INPUT_DISPLAY_ON command received.")
         setInputDisplayVisibility(true)
@@ -374,6 +397,7 @@ local function parse(line, sock, sockId)
          console:log("[INFO ] parse: LOADSTATE successful for slot " .. slot .. " with flags " .. flags)
          sock:send("OK LOADSTATE slot " .. slot .. "\n")
          hold = {}
+         g_state_loads = g_state_loads + 1
          console:log("[DEBUG] parse: Clearing hold table due to successful LOADSTATE.")
       else
          local err_msg = "emu:loadStateSlot failed for slot " .. slot .. " (flags " .. flags .. ")"
@@ -450,17 +474,40 @@ local function onRecv(id)
          end
          return
       end
-      for line in chunk:gmatch("[^\r\n]+") do
-         console:log("[DEBUG] onRecv: Received " .. #line .. " bytes from socket " .. id .. ": '" .. line .. "'")
-         local ok, perr = pcall(parse, line, s, id)
-         if not ok then
-            err(id, "parse internal exception: " .. tostring(perr))
-            pcall(s.send, s, "ERR parse internal exception\n")
-         elseif perr then
-            err(id, "Parse error: " .. perr)
-            pcall(s.send, s, "ERR " .. perr .. "\n")
+      -- commands may be pipelined, so a line or binary frame can straddle
+      -- two chunks; whatever is incomplete waits for the next receive
+      local buf = (pending[id] or "") .. chunk
+      local pos = 1
+      while pos <= #buf do
+         if buf:byte(pos) == OP_READRANGE then
+            -- binary frame: its address bytes may contain '\n', so it is
+            -- taken by length before any line splitting
+            if #buf - pos + 1 < RR_FRAME_LEN then break end
+            local _, addr, length = string_unpack(RR_FRAME_FMT, buf, pos)
+            pos = pos + RR_FRAME_LEN
+            local ok, perr = pcall(sendMemory, s, id, addr, length)
+            if not ok then
+               err(id, "READRANGE internal exception: " .. tostring(perr))
+            end
+         else
+            local nl = buf:find("\n", pos, true)
+            if not nl then break end
+            local text = buf:sub(pos, nl - 1)
+            pos = nl + 1
+            for line in text:gmatch("[^\r]+") do
+               console:log("[DEBUG] onRecv: Received " .. #line .. " bytes from socket " .. id .. ": '" .. line .. "'")
+               local ok, perr = pcall(parse, line, s, id)
+               if not ok then
+                  err(id, "parse internal exception: " .. tostring(perr))
+                  pcall(s.send, s, "ERR parse internal exception\n")
+               elseif perr then
+                  err(id, "Parse error: " .. perr)
+                  pcall(s.send, s, "ERR " .. perr .. "\n")
+               end
+            end
          end
       end
+      pending[id] = buf:sub(pos)
    end
 end
 
@@ -1,3 +1,4 @@
+import functools
 import logging
 import tiktoken
 
@@ -17,18 +18,27 @@ Note that you can use
 
 for a more accurate token usage.
 """
-try:
-    encoding = tiktoken.get_encoding("cl100k_base")
-    log.info("Tiktoken encoder 'cl100k_base' loaded.")
-except Exception as e:
-    log.warning(f"Failed to load tiktoken encoder: {e}. Token counts will be approximate (char/4).")
-    encoding = None
 
+# loaded on first count rather than at import: the BPE file can take a while
+# to fetch/parse, and runs that never count tokens shouldn't pay for it
+@functools.lru_cache(maxsize=1)
+def _get_encoder():
+    try:
+        encoding = tiktoken.get_encoding("cl100k_base")
+        log.info("Tiktoken encoder 'cl100k_base' loaded.")
+        return encoding
+    except Exception as e:
+        log.warning(f"Failed to load tiktoken encoder: {e}. Token counts will be approximate (char/4).")
+        return None
 
+
+# tiktoken's encode is pure, and history strings are recounted every call
+@functools.lru_cache(maxsize=4096)
 def count_tokens(text: str) -> int:
     """Estimates token count for a given text using the loaded encoding."""
     if not text:
         return 0
+    encoding = _get_encoder()
     if not encoding:
         return len(text) // 4
     try:
@@ -38,27 +48,90 @@ def count_tokens(text: str) -> int:
         return len(text) // 4
 
 
+# message text -> token count for plain-string messages: the history,
+# which is resent unchanged on every call until it is reset, and the
+# summary call's rebuilt copies of the same turns. Keyed on the text
+# itself, so a recycled object can never pick up another message's count.
+_MESSAGE_TOKENS: dict[str, int] = {}
+
+def clear_message_token_cache(keep=()):
+    """
+    Forget cached per-message counts; call whenever the chat history is
+    reset. Entries for messages in `keep` (e.g. the new history) survive.
+    """
+    kept = {}
+    for m in keep:
+        content = m.get('content')
+        if isinstance(content, str) and content in _MESSAGE_TOKENS:
+            kept[content] = _MESSAGE_TOKENS[content]
+    _MESSAGE_TOKENS.clear()
+    _MESSAGE_TOKENS.update(kept)
+
+
+def _message_parts(message) -> tuple[list[str], int, bool]:
+    """Text segments of a message, plus the fixed image cost and whether it had images."""
+    texts = []
+    image_tokens = 0
+    content = message.get('content', '')
+    if isinstance(content, str):
+        texts.append(content)
+    elif isinstance(content, list):
+        for item in content:
+            if isinstance(item, dict):
+                item_type = item.get('type')
+                if item_type == 'text':
+                    texts.append(item.get('text', ''))
+                elif item_type == 'image_url':
+                    image_tokens += IMAGE_TOKEN_COST_HIGH_DETAIL
+    return texts, image_tokens, image_tokens > 0
+
+
+def _count_batch(texts: list[str]) -> list[int]:
+    """Token counts for many strings in one tiktoken call (threaded, off the GIL)."""
+    encoding = _get_encoder()
+    # encode_batch spins up a thread pool per call; usually only the new
+    # user turn is uncached, and a single encode is cheaper for that
+    if not encoding or len(texts) <= 1:
+        return [count_tokens(t) for t in texts]
+    try:
+        return [len(t) for t in encoding.encode_batch(texts, num_threads=4)]
+    except Exception as e:
+        log.warning(f"Tiktoken batch encoding failed: {e}. Counting one by one.")
+        return [count_tokens(t) for t in texts]
+
+
 def calculate_prompt_tokens(messages):
     """Estimates token count for a list of messages."""
-    tokens = 0
     tokens_per_message = 3
     tokens_per_role = 1
+    tokens = 0
     try:
+        # texts not seen before are encoded in a single batch
+        pending = []
+        texts = []
         for message in messages:
             tokens += tokens_per_message + tokens_per_role
             content = message.get('content', '')
             if isinstance(content, str):
-                tokens += count_tokens(content)
-            elif isinstance(content, list):
-                for item in content:
-                    if isinstance(item, dict):
-                        item_type = item.get('type')
-                        if item_type == 'text':
-                            tokens += count_tokens(item.get('text', ''))
-                        elif item_type == 'image_url':
-                            tokens += IMAGE_TOKEN_COST_HIGH_DETAIL
+                cached = _MESSAGE_TOKENS.get(content)
+                if cached is not None:
+                    tokens += cached
+                    continue
+            parts, image_tokens, _ = _message_parts(message)
+            tokens += image_tokens
+            pending.append((content, len(parts)))
+            texts.extend(parts)
+        counts = _count_batch(texts) if texts else []
+        pos = 0
+        for content, n in pending:
+            text_tokens = sum(counts[pos:pos + n])
+            pos += n
+            # list content is the per-call user turn with images; it never reaches history
+            if isinstance(content, str):
+                _MESSAGE_TOKENS[content] = text_tokens
+            tokens += text_tokens
         tokens += 3
         return tokens
     except Exception as e:
          log.error(f"Error calculating prompt tokens: {e}", exc_info=True)
-         return 0
\ No newline at end of file
+         return 0
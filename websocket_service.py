@@ -1,7 +1,7 @@
 # --- websocket_service.py ---
 import asyncio
 import websockets
-import json
+import orjson
 import logging
 
 WEBSOCKET_PORT = 8765
@@ -10,40 +10,26 @@ connected_clients = set()
 log = logging.getLogger("websocket_service")
 
 async def broadcast_message(message):
-    """Sends a JSON message to all connected clients."""
+    """
+    Sends a JSON message to all connected clients. `message` may be a dict
+    or an already-serialized JSON str; either way it's encoded only once.
+    """
     if not connected_clients:
         return
 
-    message_json = json.dumps(message)
-    # Use create_task for better concurrency handling if many clients exist
-    send_tasks = [asyncio.create_task(client.send(message_json)) for client in connected_clients]
-    if not send_tasks:
-        return
-
-    results = await asyncio.gather(*send_tasks, return_exceptions=True)
-
-    disconnected_clients = set()
-    clients_list = list(connected_clients) # Create stable list for indexing
-    for i, result in enumerate(results):
-        if isinstance(result, Exception):
-            # Ensure index is valid before accessing clients_list
-            if i < len(clients_list):
-                client = clients_list[i]
-                log.warning(f"WS: Failed to send to client {client.remote_address}: {result}. Removing.")
-                disconnected_clients.add(client)
-            else:
-                 # This case should theoretically not happen with gather but added defensively
-                 log.error(f"WS: Index {i} out of bounds for clients list of size {len(clients_list)} during error handling.")
-
-    connected_clients.difference_update(disconnected_clients)
+    # decoded to str so clients keep getting text frames (the UI JSON.parses them)
+    message_json = message if isinstance(message, str) else orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+    # one shared, uncompressed frame written to every connection without
+    # awaiting any of them; clients that can't keep up are logged and
+    # skipped by websockets, and dropped by their handler on disconnect
+    websockets.broadcast(connected_clients, message_json)
 
 
 async def _send_full_state(websocket, current_app_state):
     """Sends the complete current state to a newly connected client."""
     try:
-        # Ensure state is JSON serializable before sending
-        state_copy = json.loads(json.dumps(current_app_state)) # Simple deep copy via JSON
-        await websocket.send(json.dumps(state_copy))
+        # serialize once; the encoded text is already a snapshot of the state
+        await websocket.send(orjson.dumps(current_app_state, option=orjson.OPT_NON_STR_KEYS).decode())
         log.info(f"WS: Sent full initial state to {websocket.remote_address}")
     except websockets.exceptions.ConnectionClosed:
         log.warning(f"WS: Failed to send initial state to {websocket.remote_address}, client disconnected before send completed.")
@@ -81,6 +67,8 @@ async def run_server_forever(app_state_dict):
     async def handler_entrypoint(websocket):
         await _actual_handler_code(websocket, app_state_dict)
 
-    async with websockets.serve(handler_entrypoint, "localhost", WEBSOCKET_PORT):
+    # no permessage-deflate: broadcast sends the same frame to every client,
+    # and per-connection compression would re-compress it for each one
+    async with websockets.serve(handler_entrypoint, "localhost", WEBSOCKET_PORT, compression=None):
         log.info(f"WebSocket server running on ws://localhost:{WEBSOCKET_PORT}")
         await asyncio.Future() # Keep server running until cancelled
\ No newline at end of file